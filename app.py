@@ -1,28 +1,163 @@
-import matplotlib
-matplotlib.use('Agg')  # Set non-interactive backend before importing pyplot
+import time
+STARTUP_TIME = time.perf_counter()
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, confusion_matrix, roc_curve, auc
-from sklearn.metrics import precision_recall_curve, f1_score, precision_score, recall_score, roc_auc_score
-from xgboost import XGBClassifier
-from flask import Flask, request, render_template_string, flash, make_response, send_from_directory
-import matplotlib.pyplot as plt
-import seaborn as sns
+from flask import Flask, request, flash, make_response, send_from_directory, jsonify, g
+from flask import Response, stream_with_context
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Mapping
+from importlib import import_module, metadata
+import joblib
+import copy
+import json
+import hashlib
+import io
+import math
+import queue
+import random
+import re
 import os
 import shutil
+import sys
+import tempfile
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
 # Flask app configuration
 app = Flask(__name__)
 app.secret_key = 'secure-secret-key'
-app.config['TEMPLATES_AUTO_RELOAD'] = True
 
 # Ensure static/images directory exists
 os.makedirs(os.path.join(app.root_path, 'static', 'images'), exist_ok=True)
 
+# Dataset and persisted model artifacts
+DATASET_PATH = os.environ.get('HEALTHCARE_AI_DATASET', 'heart.csv')
+ARTIFACT_DIR = os.environ.get('HEALTHCARE_AI_ARTIFACT_DIR', os.path.join(app.root_path, 'artifacts'))
+ARTIFACT_FORMAT = 8
+
+# The CSV is parsed once into a columnar store of compact .npy columns that every worker memory-maps
+DATASET_STORE = os.environ.get('HEALTHCARE_AI_DATASET_STORE', '1') == '1'
+DATASET_STORE_DIR = os.environ.get('HEALTHCARE_AI_DATASET_STORE_DIR', os.path.join(ARTIFACT_DIR, 'datasets'))
+DATASET_STORE_FORMAT = 2
+
+# Seconds between checks of the dataset for changes (0 disables background retraining)
+RELOAD_INTERVAL = float(os.environ.get('HEALTHCARE_AI_RELOAD_INTERVAL', 0))
+
+# Rows appended to the dataset continue the current models instead of a full retrain, as long as they are at
+# most INCREMENTAL_MAX_FRACTION of the training rows so far
+INCREMENTAL_TRAINING = os.environ.get('HEALTHCARE_AI_INCREMENTAL_TRAINING', '0') == '1'
+INCREMENTAL_MAX_FRACTION = float(os.environ.get('HEALTHCARE_AI_INCREMENTAL_MAX_FRACTION', 0.5))
+INCREMENTAL_TOLERANCE = 1e-6
+
+# Serve-only workers load a persisted model and never train at startup
+SERVE_ONLY = os.environ.get('HEALTHCARE_AI_SERVE_ONLY', '0') == '1'
+IMPORT_REPORT = os.environ.get('HEALTHCARE_AI_IMPORT_REPORT', '0') == '1'
+
+# Serve the best model from its exported NumPy form; the export is only kept if it agrees within tolerance
+NATIVE_INFERENCE = os.environ.get('HEALTHCARE_AI_NATIVE_INFERENCE', '0') == '1'
+NATIVE_TOLERANCE = 1e-6
+# The export is checked against its estimator on a random sample of at most this many rows
+NATIVE_VERIFY_ROWS = 5000
+NATIVE_BLOCK_ROWS = 256
+# Tree exports win for single patients and micro-batches; larger blocks go to the compiled estimator
+NATIVE_BATCH_MAX_ROWS = 64
+# Per-field contributions come from the best model's export; with both off, training skips the export
+EXPLANATIONS = os.environ.get('HEALTHCARE_AI_EXPLANATIONS', '1') == '1'
+
+# Candidate models and their hyperparameters (part of the artifact key)
+MODEL_CLASSES = {
+    "Logistic Regression": ('sklearn.linear_model', 'LogisticRegression'),
+    "Random Forest": ('sklearn.ensemble', 'RandomForestClassifier'),
+    "XGBoost": ('xgboost', 'XGBClassifier')
+}
+MODEL_PARAMS = {
+    "Logistic Regression": {"max_iter": 1000, "random_state": 42},
+    "Random Forest": {"random_state": 42},
+    "XGBoost": {"random_state": 42, "eval_metric": 'logloss'}
+}
+
+# Concurrent candidate fits during training (0 = one per core, capped at the number of candidates)
+TRAINING_WORKERS = int(os.environ.get('HEALTHCARE_AI_TRAINING_WORKERS', 0))
+MULTITHREADED_MODELS = {"Random Forest", "XGBoost"}
+
+# Optional k-fold hyperparameter search with successive halving before the final fit. Folds and configurations
+# run in a process pool; per-fold results are cached under SEARCH_DIR so an interrupted search resumes.
+MODEL_SEARCH = os.environ.get('HEALTHCARE_AI_MODEL_SEARCH', '0') == '1'
+SEARCH_FOLDS = int(os.environ.get('HEALTHCARE_AI_SEARCH_FOLDS', 5))
+SEARCH_HALVING_FACTOR = int(os.environ.get('HEALTHCARE_AI_SEARCH_HALVING_FACTOR', 3))
+SEARCH_WORKERS = int(os.environ.get('HEALTHCARE_AI_SEARCH_WORKERS', 0))
+SEARCH_BUDGET_SECONDS = float(os.environ.get('HEALTHCARE_AI_SEARCH_BUDGET_SECONDS', 0))
+SEARCH_DIR = os.environ.get('HEALTHCARE_AI_SEARCH_DIR', os.path.join(ARTIFACT_DIR, 'search'))
+SEARCH_SPACE = {
+    "Logistic Regression": {"C": [0.01, 0.1, 1.0, 10.0]},
+    "Random Forest": {"n_estimators": [100, 300], "max_depth": [None, 5, 10], "min_samples_leaf": [1, 3]},
+    "XGBoost": {"n_estimators": [100, 300], "max_depth": [3, 6], "learning_rate": [0.05, 0.1, 0.3]}
+}
+
+# Ensemble serving ('soft_vote' or 'stacking'; empty serves the best model alone). Every model scores each request
+# on its own thread; models still running when the single-patient budget runs out are left out of the vote.
+ENSEMBLE_METHOD = os.environ.get('HEALTHCARE_AI_ENSEMBLE', '')
+ENSEMBLE_BUDGET_MS = float(os.environ.get('HEALTHCARE_AI_ENSEMBLE_BUDGET_MS', 50))
+
+# Probability calibration ('isotonic', 'sigmoid' or empty for none), fitted on out-of-fold probabilities of the
+# training split, and the default operating point ('youden', 'sensitivity:0.9', 'specificity:0.95'; empty is 0.5)
+CALIBRATION = os.environ.get('HEALTHCARE_AI_CALIBRATION', '')
+OPERATING_POINT = os.environ.get('HEALTHCARE_AI_OPERATING_POINT', '')
+OPERATING_POINT_STEPS = 100
+
+# Folds for the out-of-fold probabilities behind stacking and calibration
+HOLDOUT_FOLDS = 5
+
+# Value types accepted by the NumPy single-patient inference path
+NUMERIC_TYPES = (int, float, np.integer, np.floating)
+
+# Batch scoring limits
+BATCH_CHUNK_SIZE = int(os.environ.get('HEALTHCARE_AI_BATCH_CHUNK_SIZE', 10000))
+BATCH_MAX_ROWS = int(os.environ.get('HEALTHCARE_AI_BATCH_MAX_ROWS', 100000))
+
+# Rendered plots are cached per model version; older versions are evicted least recently used first, but
+# only once unused for VIZ_CACHE_MIN_AGE seconds so pages rendered just before a model swap keep their images
+VIZ_CACHE_DIR = os.path.join(app.root_path, 'static', 'images', 'cache')
+VIZ_CACHE_VERSIONS = int(os.environ.get('HEALTHCARE_AI_VIZ_CACHE_VERSIONS', 3))
+VIZ_CACHE_MIN_AGE = float(os.environ.get('HEALTHCARE_AI_VIZ_CACHE_MIN_AGE', 600))
+
+# Memoized single-patient predictions (size 0 disables the cache)
+PREDICTION_CACHE_SIZE = int(os.environ.get('HEALTHCARE_AI_PREDICTION_CACHE_SIZE', 4096))
+PREDICTION_CACHE_TTL = float(os.environ.get('HEALTHCARE_AI_PREDICTION_CACHE_TTL', 600))
+
+# Micro-batching of concurrent single-patient requests (wait of 0 disables it)
+MICRO_BATCH_WAIT_MS = float(os.environ.get('HEALTHCARE_AI_MICRO_BATCH_WAIT_MS', 0))
+MICRO_BATCH_MAX_ROWS = int(os.environ.get('HEALTHCARE_AI_MICRO_BATCH_MAX_ROWS', 64))
+
+# Prometheus metrics on /metrics (set to 0 to stop recording); latency bucket bounds in seconds
+METRICS_ENABLED = os.environ.get('HEALTHCARE_AI_METRICS', '1') == '1'
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+
+# Opt-in sampling profiler. Requests are profiled at PROFILE_RATE, or on demand with an "X-Profile: 1" header
+# when PROFILE_HEADER is set; stacks are written as folded text for flamegraph.pl or speedscope.
+PROFILE_DIR = os.environ.get('HEALTHCARE_AI_PROFILE_DIR', os.path.join(app.root_path, 'profiles'))
+PROFILE_RATE = float(os.environ.get('HEALTHCARE_AI_PROFILE_RATE', 0))
+PROFILE_HEADER = os.environ.get('HEALTHCARE_AI_PROFILE_HEADER', '0') == '1'
+PROFILE_INTERVAL_MS = float(os.environ.get('HEALTHCARE_AI_PROFILE_INTERVAL_MS', 5))
+PROFILE_MAX_FILES = int(os.environ.get('HEALTHCARE_AI_PROFILE_MAX_FILES', 200))
+
+# Dataset browser paging and filtering
+DATASET_PAGE_SIZE = 100
+DATASET_MAX_PAGE_SIZE = 1000
+FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(==|!=|>=|<=|>|<|=)\s*(.+?)\s*$')
+FILTER_OPERATORS = {
+    '==': np.equal,
+    '=': np.equal,
+    '!=': np.not_equal,
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '<': np.less
+}
+
 # Categorical feature options (for validation)
 CATEGORICAL_OPTIONS = {
     'Sex': ['0', '1'],
@@ -35,6 +170,9 @@ CATEGORICAL_OPTIONS = {
     'Thal': ['0', '1', '2', '3']
 }
 
+# Uploaded CSVs keep categorical codes as text so they are validated like form values
+CSV_DTYPES = {col: str for col in CATEGORICAL_OPTIONS}
+
 # Base HTML template
 BASE_HTML = """
 <!DOCTYPE html>
@@ -444,15 +582,7 @@ BASE_HTML = """
             <h1>{{ title }}</h1>
         </div>
         
-        {% with messages = get_flashed_messages(with_categories=true) %}
-            {% if messages %}
-                {% for category, message in messages %}
-                    <div class="flash-message {{ category }}" role="alert">
-                        {{ message }}
-                    </div>
-                {% endfor %}
-            {% endif %}
-        {% endwith %}
+        {{ flashes | safe }}
         
         <div class="glass-container">
             {{ content | safe }}
@@ -654,22 +784,54 @@ PREDICT_HTML = """
 
         const formData = new FormData(document.getElementById('prediction-form'));
         try {
-            const response = await fetch('/', {
+            const response = await fetch('/api/predict', {
                 method: 'POST',
                 body: formData
             });
-            const html = await response.text();
-            const parser = new DOMParser();
-            const doc = parser.parseFromString(html, 'text/html');
-            const newResult = doc.querySelector('#prediction-result').innerHTML;
-            document.getElementById('prediction-result').innerHTML = newResult;
-
-            // Display flash messages
-            const flashMessages = doc.querySelectorAll('.flash-message');
+            const data = await response.json();
+
+            // Display validation errors the same way as flash messages
+            document.querySelectorAll('.flash-message').forEach(msg => msg.remove());
             const mainContent = document.querySelector('.main-content');
-            const existingFlash = document.querySelectorAll('.flash-message');
-            existingFlash.forEach(msg => msg.remove());
-            flashMessages.forEach(msg => mainContent.insertBefore(msg, mainContent.firstChild));
+            (data.errors || []).forEach(message => {
+                const flashDiv = document.createElement('div');
+                flashDiv.className = 'flash-message error';
+                flashDiv.setAttribute('role', 'alert');
+                flashDiv.textContent = message;
+                mainContent.insertBefore(flashDiv, mainContent.firstChild);
+            });
+            if (!response.ok) return;
+
+            const resultDiv = document.getElementById('prediction-result');
+            resultDiv.innerHTML = '<h3 style="margin-bottom: 20px;">Prediction Result</h3>';
+            const alertDiv = document.createElement('div');
+            alertDiv.style.cssText = `background: ${data.prediction === 1 ? '#ef5350' : '#4caf50'}; padding: 15px; border-radius: 8px;`;
+            alertDiv.setAttribute('role', 'alert');
+            const label = document.createElement('strong');
+            label.textContent = data.label;
+            const probability = document.createElement('p');
+            probability.textContent = `Probability: ${data.probability_percent}%`;
+            alertDiv.append(label, probability);
+            if (data.models) {
+                const agreeing = Math.round(data.agreement * Object.keys(data.models).length);
+                const models = document.createElement('p');
+                models.textContent = `Model agreement: ${agreeing} of ${Object.keys(data.models).length} models` +
+                    Object.entries(data.models).map(([name, value]) => ` \u00b7 ${name} ${(value * 100).toFixed(2)}%`).join('');
+                alertDiv.appendChild(models);
+            }
+            if (data.explanation) {
+                const drivers = Object.entries(data.explanation.contributions)
+                    .sort((a, b) => Math.abs(b[1]) - Math.abs(a[1])).slice(0, 5);
+                const factors = document.createElement('p');
+                const explained = data.explanation;
+                const own = Math.abs(explained.model_probability - data.probability) > 1e-9 ?
+                    ` in the ${explained.model} score of ${(explained.model_probability * 100).toFixed(2)}%` +
+                    ' (before calibration and ensembling)' : '';
+                factors.textContent = `Main factors${own}:` +
+                    drivers.map(([name, value]) => ` \u00b7 ${name} ${value >= 0 ? '+' : ''}${value.toFixed(3)}`).join('');
+                alertDiv.appendChild(factors);
+            }
+            resultDiv.appendChild(alertDiv);
         } catch (error) {
             const errorDiv = document.getElementById('error-message');
             errorDiv.innerText = 'An error occurred while predicting. Please try again.';
@@ -686,32 +848,44 @@ PREDICT_HTML = """
 # Dataset page template
 DATASET_HTML = """
 <h1 style="margin-bottom: 20px;">Loaded Dataset</h1>
+<form method="get" action="{{ url_for('show_dataset') }}" style="display: flex; gap: 10px; flex-wrap: wrap; margin-bottom: 15px;">
+    <input type="text" name="filter" value="{{ filters | join(', ') }}" placeholder="Filter, e.g. Age>=50, Sex==1" aria-label="Filter rows"
+           style="flex: 1; min-width: 220px; padding: 8px; background: rgba(255, 255, 255, 0.1); color: #F5F5F5; border: 1px solid rgba(255, 255, 255, 0.3); border-radius: 8px;">
+    <input type="hidden" name="sort" value="{{ sort or '' }}">
+    <input type="hidden" name="limit" value="{{ limit }}">
+    <button type="submit" style="padding: 8px 16px; background: #BB86FC; color: #121212; border: none; border-radius: 8px; cursor: pointer;">Apply</button>
+</form>
 <div style="overflow-x: auto;">
     <table style="width: 100%; border-collapse: collapse; border-radius: 8px; overflow: hidden;">
         <thead style="background: rgba(187, 134, 252, 0.3);">
             <tr>
                 {% for column in columns %}
-                <th style="padding: 12px; text-align: left; border-bottom: 1px solid rgba(255, 255, 255, 0.2);">{{ column }}</th>
+                <th style="padding: 12px; text-align: left; border-bottom: 1px solid rgba(255, 255, 255, 0.2);">
+                    <a href="{{ url_for('show_dataset', sort=('-' + column if sort == column else column), limit=limit, filter=filters) }}"
+                       style="color: inherit; text-decoration: none;">{{ column }}{% if sort == column %} &#9650;{% elif sort == '-' + column %} &#9660;{% endif %}</a>
+                </th>
                 {% endfor %}
             </tr>
         </thead>
         <tbody>
-            {% for _, row in dataset.iterrows() %}
-            {% if loop.index <= 100 %}
+            {% for row in rows %}
             <tr style="border-bottom: 1px solid rgba(255, 255, 255, 0.1);">
-                {% for column in columns %}
-                <td style="padding: 10px; text-align: left;">{{ row[column] }}</td>
+                {% for value in row %}
+                <td style="padding: 10px; text-align: left;">{{ value }}</td>
                 {% endfor %}
             </tr>
-            {% endif %}
             {% endfor %}
         </tbody>
     </table>
-    {% if dataset|length > 100 %}
     <p style="margin-top: 15px; text-align: center; color: #BB86FC;">
-        Showing first 100 rows of {{ dataset|length }} total rows.
+        {% if offset > 0 %}
+        <a href="{{ url_for('show_dataset', offset=[offset - limit, 0]|max, limit=limit, sort=sort, filter=filters) }}" style="color: inherit;">&larr; Previous</a> |
+        {% endif %}
+        {% if rows %}Showing rows {{ offset + 1 }}-{{ offset + rows|length }} of {{ total }}{% else %}No rows to show ({{ total }} matching){% endif %}{% if total != dataset_size %} (filtered from {{ dataset_size }}){% endif %}.
+        {% if offset + limit < total %}
+        | <a href="{{ url_for('show_dataset', offset=offset + limit, limit=limit, sort=sort, filter=filters) }}" style="color: inherit;">Next &rarr;</a>
+        {% endif %}
     </p>
-    {% endif %}
 </div>
 """
 
@@ -721,25 +895,373 @@ PREDICTION_RESULT_HTML = """
 <div style="background: {{ '#ef5350' if prediction_class == 'danger' else '#4caf50' }}; padding: 15px; border-radius: 8px;" role="alert">
     <strong>{{ prediction_text }}</strong>
     <p>Probability: {{ probability }}%</p>
+    {% if models %}<p>Model agreement: {{ agreeing }} of {{ models|length }} models{% for name, value in models.items() %}
+        &middot; {{ name }} {{ '%.2f'|format(value * 100) }}%{% endfor %}</p>{% endif %}
+    {% if drivers %}<p>Main factors{% if explained %} in the {{ explained.model }} score of
+        {{ '%.2f'|format(explained.model_probability * 100) }}% (before calibration and ensembling){% endif %}:
+        {%- for name, value in drivers %}
+        &middot; {{ name }} {{ '%+.3f'|format(value) }}{% endfor %}</p>{% endif %}
+</div>
+"""
+
+# Lazy imports: plotting and training libraries load on first use and their cost is recorded
+IMPORT_TIMES = {}
+
+def lazy_import(name):
+    if name not in IMPORT_TIMES:
+        start = time.perf_counter()
+        import_module(name)
+        IMPORT_TIMES[name] = time.perf_counter() - start
+    return import_module(name)
+
+def load_pyplot():
+    if 'matplotlib' not in IMPORT_TIMES:
+        lazy_import('matplotlib').use('Agg')  # Set non-interactive backend before importing pyplot
+    return lazy_import('matplotlib.pyplot')
+
+def import_report():
+    report = sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True)
+    return {"modules": dict(report), "startup": STARTUP_SECONDS}
+
+# Model visualisations page template
+MODEL_VISUALISATIONS_HTML = """
+<h1 style="margin-bottom: 20px;">Model Performance Visualizations</h1>
+
+<!-- Model Visualisations Section -->
+<div style="background: rgba(255, 255, 255, 0.08); border-radius: 8px; padding: 20px; margin-bottom: 30px;">
+    <div style="display: flex; flex-direction: column; gap: 20px;">
+        {% if model_metrics %}
+        <div>
+            <h3>Model Performance Metrics</h3>
+            <img src="{{ model_metrics }}" alt="Model Performance Metrics" style="max-width: 100%; border-radius: 8px;">
+        </div>
+        {% endif %}
+        {% if roc_curve %}
+        <div>
+            <h3>ROC Curve</h3>
+            <img src="{{ roc_curve }}" alt="ROC Curve" style="max-width: 100%; border-radius: 8px;">
+        </div>
+        {% endif %}
+        {% if precision_recall_curve %}
+        <div>
+            <h3>Precision-Recall Curve</h3>
+            <img src="{{ precision_recall_curve }}" alt="Precision-Recall Curve" style="max-width: 100%; border-radius: 8px;">
+        </div>
+        {% endif %}
+        {% if confusion_matrix %}
+        <div>
+            <h3>Confusion Matrix</h3>
+            <img src="{{ confusion_matrix }}" alt="Confusion Matrix" style="max-width: 100%; border-radius: 8px;">
+        </div>
+        {% endif %}
+    </div>
 </div>
 """
 
+# Patient visualisations page template
+PATIENT_VISUALISATIONS_HTML = """
+<h1 style="margin-bottom: 20px;">Patient Result Visualizations</h1>
+
+<!-- Patient Result Visualisations Section -->
+<div style="background: rgba(255, 255, 255, 0.08); border-radius: 8px; padding: 20px;">
+    <div style="display: flex; flex-direction: column; gap: 20px;">
+        {% if feature_importance %}
+        <div>
+            <h3>Feature Importance</h3>
+            <img src="{{ feature_importance }}" alt="Feature Importance" style="max-width: 100%; border-radius: 8px;">
+        </div>
+        {% endif %}
+        {% if correlation_matrix %}
+        <div>
+            <h3>Correlation Matrix</h3>
+            <img src="{{ correlation_matrix }}" alt="Correlation Matrix" style="max-width: 100%; border-radius: 8px;">
+        </div>
+        {% endif %}
+        {% if patient_distribution %}
+        <div>
+            <h3>Patient Distribution</h3>
+            <img src="{{ patient_distribution }}" alt="Patient Distribution" style="max-width: 100%; border-radius: 8px;">
+        </div>
+        {% endif %}
+    </div>
+</div>
+"""
+
+# Flash messages fragment (the only per-request part of the page shell)
+FLASH_HTML = """
+{% with messages = get_flashed_messages(with_categories=true) %}
+    {% for category, message in messages %}
+        <div class="flash-message {{ category }}" role="alert">
+            {{ message }}
+        </div>
+    {% endfor %}
+{% endwith %}
+"""
+
+# Templates are compiled once; the page shell (CSS, sidebar, footer) is rendered once per title
+BASE_TEMPLATE = app.jinja_env.from_string(BASE_HTML)
+FLASH_TEMPLATE = app.jinja_env.from_string(FLASH_HTML)
+DATASET_TEMPLATE = app.jinja_env.from_string(DATASET_HTML)
+PREDICTION_RESULT_TEMPLATE = app.jinja_env.from_string(PREDICTION_RESULT_HTML)
+MODEL_VISUALISATIONS_TEMPLATE = app.jinja_env.from_string(MODEL_VISUALISATIONS_HTML)
+PATIENT_VISUALISATIONS_TEMPLATE = app.jinja_env.from_string(PATIENT_VISUALISATIONS_HTML)
+PREDICT_RESULT_PLACEHOLDER = """<div id="prediction-result" style="margin-top: 20px;">
+    <h3 style="margin-bottom: 20px;">Prediction Result</h3>
+    <p>Submit the form to see the prediction result.</p>
+</div>"""
+PREDICT_HTML_HEAD, PREDICT_HTML_TAIL = PREDICT_HTML.split(PREDICT_RESULT_PLACEHOLDER)
+FLASH_MARKER = '<!--flash-messages-->'
+CONTENT_MARKER = '<!--page-content-->'
+PAGE_SHELLS = {}
+
+def page_shell(title):
+    shell = PAGE_SHELLS.get(title)
+    if shell is None:
+        html = BASE_TEMPLATE.render(title=title, flashes=FLASH_MARKER, content=CONTENT_MARKER)
+        head, rest = html.split(FLASH_MARKER)
+        shell = (head, *rest.split(CONTENT_MARKER))
+        PAGE_SHELLS[title] = shell
+    return shell
+
+def render(template, **context):
+    start = time.perf_counter()
+    try:
+        return template.render(**context)
+    finally:
+        STAGE_LATENCY.observe(('template_render',), time.perf_counter() - start)
+
+def page_response(title, content, last_modified=None):
+    head, middle, tail = page_shell(title)
+    flashes = render(FLASH_TEMPLATE).strip()
+    response = make_response(''.join([head, flashes, middle, content, tail]))
+    response.headers['Content-Type'] = 'text/html; charset=utf-8'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    if flashes or last_modified is None:
+        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        return response
+    # Pages without flash messages only change with the model generation, so browsers can revalidate
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    response.last_modified = last_modified
+    return response.make_conditional(request)
+
+# Prediction request options and result formatting
+def top_contributions(explanation, count=5):
+    # Largest contributions by magnitude, as (field, signed value) pairs for the result card
+    if not explanation:
+        return []
+    items = sorted(explanation['contributions'].items(), key=lambda item: -abs(item[1]))
+    return items[:count]
+
+def request_threshold(ai, args):
+    # ?threshold= wins over ?operating_point=; without either the generation's configured default applies
+    if 'threshold' in args:
+        return float(args['threshold']), None
+    if 'operating_point' not in args:
+        return ai.default_threshold, ai.default_operating_point
+    threshold, sensitivity, specificity = lookup_operating_point(ai.operating_points, args['operating_point'])
+    return threshold, {"name": args['operating_point'], "sensitivity": sensitivity, "specificity": specificity}
+
+# Dataset browser query parsing
+def parse_dataset_query(args):
+    offset = max(int(args.get('offset', 0)), 0)
+    limit = min(max(int(args.get('limit', DATASET_PAGE_SIZE)), 1), DATASET_MAX_PAGE_SIZE)
+    sort = args.get('sort') or None
+    filters = []
+    for raw in args.getlist('filter'):
+        for expression in raw.split(','):
+            if not expression.strip():
+                continue
+            match = FILTER_PATTERN.match(expression)
+            if not match:
+                raise ValueError(f"Invalid filter '{expression.strip()}'. Use e.g. Age>=50.")
+            filters.append(match.groups())
+    return offset, limit, sort, filters
+
+# Input validation
+def validate_patient(values, columns):
+    patient_data = {}
+    for field, value in values.items():
+        if field not in columns:
+            continue
+        if field in CATEGORICAL_OPTIONS:
+            if value not in CATEGORICAL_OPTIONS[field]:
+                return None, f"Invalid value for {field}. Select a valid option."
+            patient_data[field] = int(value)
+        else:
+            try:
+                patient_data[field] = float(value)
+            except ValueError:
+                return None, f"Invalid value for {field}. Please enter a valid number."
+            # float() also accepts 'nan' and 'inf', which no model can score
+            if not math.isfinite(patient_data[field]):
+                return None, f"Invalid value for {field}. Please enter a valid number."
+    return patient_data, None
+
+def validate_frame(frame, columns):
+    # Vectorized counterpart of validate_patient; categorical columns must hold strings
+    n_rows = len(frame)
+    errors = pd.Series([None] * n_rows, index=frame.index, dtype=object)
+    clean = {}
+    for field in columns:
+        if field not in frame.columns:
+            errors[errors.isna()] = f"Missing value for {field}."
+            continue
+        values = frame[field]
+        if field in CATEGORICAL_OPTIONS:
+            values = values.astype(str)
+            valid = values.isin(CATEGORICAL_OPTIONS[field])
+            message = f"Invalid value for {field}. Select a valid option."
+            numeric = pd.to_numeric(values.where(valid), errors='coerce')
+        else:
+            if pd.api.types.is_numeric_dtype(values):
+                numeric = values
+            else:
+                numeric = pd.to_numeric(values.astype(str), errors='coerce')
+            valid = numeric.notna() & np.isfinite(numeric.astype(np.float64))
+            message = f"Invalid value for {field}. Please enter a valid number."
+        errors[errors.isna() & ~valid] = message
+        clean[field] = numeric.astype(np.float64)
+    valid_rows = errors.isna().to_numpy()
+    clean_frame = pd.DataFrame(clean, index=frame.index)[valid_rows]
+    error_list = [{"row": int(row), "error": message}
+                  for row, message in zip(np.flatnonzero(~valid_rows), errors[~valid_rows])]
+    return clean_frame, np.flatnonzero(valid_rows), error_list
+
+# Model evaluation (computed once per training run)
+def evaluate_model(model, X_test_scaled, y_test):
+    metrics = lazy_import('sklearn.metrics')
+    y_true = np.asarray(y_test)
+    y_pred = model.predict(X_test_scaled)
+    report = {
+        'classes': np.asarray(model.classes_),
+        'y_true': y_true,
+        'y_pred': y_pred,
+        'y_prob': None,
+        'accuracy': float(metrics.accuracy_score(y_true, y_pred)),
+        'f1': float(metrics.f1_score(y_true, y_pred, average='weighted')),
+        'precision': float(metrics.precision_score(y_true, y_pred, average='weighted')),
+        'recall': float(metrics.recall_score(y_true, y_pred, average='weighted')),
+        'auc_roc': 0.0,
+        'confusion_matrix': metrics.confusion_matrix(y_true, y_pred)
+    }
+    if len(model.classes_) == 2:
+        y_prob = model.predict_proba(X_test_scaled)[:, 1]
+        fpr, tpr, _ = metrics.roc_curve(y_true, y_prob)
+        pr_precision, pr_recall, _ = metrics.precision_recall_curve(y_true, y_prob)
+        report.update({
+            'y_prob': y_prob,
+            'fpr': fpr,
+            'tpr': tpr,
+            'roc_auc': float(metrics.auc(fpr, tpr)),
+            'pr_precision': pr_precision,
+            'pr_recall': pr_recall,
+            'binary_precision': float(metrics.precision_score(y_true, y_pred))
+        })
+        try:
+            report['auc_roc'] = float(metrics.roc_auc_score(y_true, y_prob))
+        except ValueError:
+            pass
+    return report
+
+def scalar_metrics(report):
+    return {key: report[key] for key in ['accuracy', 'f1', 'precision', 'recall', 'auc_roc']}
+
+# Monotone map from served probabilities to calibrated ones, kept as plain numbers so serving needs no sklearn:
+# isotonic regression as its breakpoints (interpolated as IsotonicRegression.predict does), Platt scaling as a
+# slope and intercept on the log-odds
+class Calibrator:
+    def __init__(self, state):
+        self.method = state['method']
+        self.x = np.asarray(state.get('x', ()), dtype=np.float64)
+        self.y = np.asarray(state.get('y', ()), dtype=np.float64)
+        self.slope = state.get('slope')
+        self.intercept = state.get('intercept')
+
+    def state(self):
+        if self.method == 'isotonic':
+            return {'method': self.method, 'x': self.x, 'y': self.y}
+        return {'method': self.method, 'slope': self.slope, 'intercept': self.intercept}
+
+    @staticmethod
+    def log_odds(probability):
+        probability = np.clip(np.asarray(probability, dtype=np.float64), 1e-12, 1 - 1e-12)
+        return np.log(probability / (1 - probability))
+
+    @classmethod
+    def fit(cls, method, probability, y_true):
+        if method == 'isotonic':
+            isotonic = lazy_import('sklearn.isotonic').IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+            isotonic.fit(probability, y_true)
+            return cls({'method': method, 'x': isotonic.X_thresholds_, 'y': isotonic.y_thresholds_})
+        if method == 'sigmoid':
+            platt = lazy_import('sklearn.linear_model').LogisticRegression(C=1e6)
+            platt.fit(cls.log_odds(probability).reshape(-1, 1), y_true)
+            return cls({'method': method, 'slope': float(platt.coef_[0][0]), 'intercept': float(platt.intercept_[0])})
+        raise ValueError(f"Unknown calibration method '{method}'")
+
+    def apply(self, probability):
+        if self.method == 'isotonic':
+            return np.interp(probability, self.x, self.y)
+        return 1.0 / (1.0 + np.exp(-(self.slope * self.log_odds(probability) + self.intercept)))
+
+# Operating points from the held-out probabilities: for every target sensitivity and specificity in steps of
+# 1 / OPERATING_POINT_STEPS, the threshold that reaches it with the best value of the other measure, plus the
+# threshold maximising Youden's J. Serving indexes straight into the table.
+def operating_points(y_true, probability):
+    metrics = lazy_import('sklearn.metrics')
+    fpr, tpr, thresholds = metrics.roc_curve(y_true, probability, drop_intermediate=False)
+    # The first ROC point (nothing positive) has an infinite threshold; anything above 1 behaves the same
+    thresholds = np.minimum(thresholds, np.nextafter(1.0, 2.0))
+    targets = np.arange(OPERATING_POINT_STEPS + 1) / OPERATING_POINT_STEPS
+    # tpr and fpr both rise as the threshold falls
+    by_sensitivity = np.minimum(np.searchsorted(tpr, targets, side='left'), len(tpr) - 1)
+    by_specificity = np.maximum(np.searchsorted(fpr, 1.0 - targets, side='right') - 1, 0)
+    best = int(np.argmax(tpr - fpr))
+    return {
+        'steps': OPERATING_POINT_STEPS,
+        'sensitivity': {'threshold': thresholds[by_sensitivity].tolist(), 'sensitivity': tpr[by_sensitivity].tolist(),
+                        'specificity': (1.0 - fpr[by_sensitivity]).tolist()},
+        'specificity': {'threshold': thresholds[by_specificity].tolist(), 'sensitivity': tpr[by_specificity].tolist(),
+                        'specificity': (1.0 - fpr[by_specificity]).tolist()},
+        'youden': {'threshold': float(thresholds[best]), 'sensitivity': float(tpr[best]),
+                   'specificity': float(1.0 - fpr[best])}
+    }
+
+def lookup_operating_point(table, spec):
+    # 'youden', 'sensitivity:<target>' or 'specificity:<target>'; returns threshold, sensitivity, specificity
+    name, _, target = spec.partition(':')
+    if table is None:
+        raise ValueError("No operating-point table for this model.")
+    if name == 'youden' and not target:
+        point = table['youden']
+        return point['threshold'], point['sensitivity'], point['specificity']
+    if name not in ('sensitivity', 'specificity'):
+        raise ValueError(f"Unknown operating point '{spec}'. Use youden, sensitivity:<0-1> or specificity:<0-1>.")
+    try:
+        target = float(target)
+    except ValueError:
+        raise ValueError(f"Operating point target must be a number, got '{target}'.")
+    if not 0.0 <= target <= 1.0:
+        raise ValueError("Operating point target must be between 0 and 1.")
+    # Rounded up, so the requested level is always reached on the held-out data
+    index = math.ceil(target * table['steps'] - 1e-9)
+    column = table[name]
+    return column['threshold'][index], column['sensitivity'][index], column['specificity'][index]
+
 # Visualization creation
 def create_visualization(viz_type, data, figsize=(10, 8), save_path=None):
     global fig
+    plt = load_pyplot()
     try:
         fig, ax = plt.subplots(figsize=figsize)
+        report = data.get('report')
+        if report is None and all(k in data for k in ['X_test_scaled', 'y_test', 'model']):
+            report = evaluate_model(data['model'], data['X_test_scaled'], data['y_test'])
         if viz_type.lower() == "roc_curve":
-            if not all(k in data for k in ['X_test_scaled', 'y_test', 'model']):
-                return None
-            model = data['model']
-            X_test_scaled = data['X_test_scaled']
-            y_test = data['y_test']
-            if len(model.classes_) != 2:
+            if report is None or len(report['classes']) != 2:
                 return None
-            y_prob = model.predict_proba(X_test_scaled)[:, 1]
-            fpr, tpr, _ = roc_curve(y_test, y_prob)
-            roc_auc = auc(fpr, tpr)
+            fpr, tpr, roc_auc = report['fpr'], report['tpr'], report['roc_auc']
             ax.plot(fpr, tpr, lw=2, label=f'ROC curve (area = {roc_auc:.2f})')
             ax.plot([0, 1], [0, 1], 'k--', lw=2)
             ax.set_xlim([0.0, 1.0])
@@ -749,14 +1271,10 @@ def create_visualization(viz_type, data, figsize=(10, 8), save_path=None):
             ax.set_title('Receiver Operating Characteristic')
             ax.legend(loc="lower right")
         elif viz_type.lower() == "confusion_matrix":
-            if not all(k in data for k in ['X_test_scaled', 'y_test', 'model']):
+            if report is None:
                 return None
-            model = data['model']
-            X_test_scaled = data['X_test_scaled']
-            y_test = data['y_test']
-            y_pred = model.predict(X_test_scaled)
-            cm = confusion_matrix(y_test, y_pred)
-            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax)
+            cm = report['confusion_matrix']
+            lazy_import('seaborn').heatmap(cm, annot=True, fmt='d', cmap='Blues', ax=ax)
             ax.set_xlabel('Predicted Labels')
             ax.set_ylabel('True Labels')
             ax.set_title('Confusion Matrix')
@@ -782,6 +1300,7 @@ def create_visualization(viz_type, data, figsize=(10, 8), save_path=None):
                 return None
             features = data['features']
             corr_matrix = features.corr()
+            sns = lazy_import('seaborn')
             if corr_matrix.shape[0] > 20:
                 mask = np.abs(corr_matrix) < 0.3
                 np.fill_diagonal(mask, False)
@@ -793,12 +1312,10 @@ def create_visualization(viz_type, data, figsize=(10, 8), save_path=None):
                             vmin=-1, vmax=1, ax=ax, fmt='.2f')
                 ax.set_title('Feature Correlation Matrix')
         elif viz_type.lower() == "patient_distribution":
-            if not all(k in data for k in ['X_test_scaled', 'y_test', 'model']):
+            if report is None:
                 return None
-            model = data['model']
-            X_test_scaled = data['X_test_scaled']
-            y_test = data['y_test']
-            y_pred = model.predict(X_test_scaled)
+            y_test = report['y_true']
+            y_pred = report['y_pred']
             actual_counts = pd.Series(y_test).value_counts().sort_index()
             predicted_counts = pd.Series(y_pred).value_counts().sort_index()
             classes = np.sort(np.unique(np.concatenate([y_test, y_pred])))
@@ -822,42 +1339,21 @@ def create_visualization(viz_type, data, figsize=(10, 8), save_path=None):
             for i, v in enumerate(predicted_values):
                 ax.text(i + width / 2, v + 0.5, str(v), ha='center')
         elif viz_type.lower() == "precision_recall_curve":
-            if not all(k in data for k in ['X_test_scaled', 'y_test', 'model']):
+            if report is None or len(report['classes']) != 2:
                 return None
-            model = data['model']
-            X_test_scaled = data['X_test_scaled']
-            y_test = data['y_test']
-            if len(model.classes_) != 2:
-                return None
-            y_prob = model.predict_proba(X_test_scaled)[:, 1]
-            precision, recall, _ = precision_recall_curve(y_test, y_prob)
+            precision, recall = report['pr_precision'], report['pr_recall']
             ax.plot(recall, precision, marker='.', label='Precision-Recall curve')
             ax.set_xlabel('Recall')
             ax.set_ylabel('Precision')
             ax.set_title('Precision-Recall Curve')
             ax.grid(True)
-            ap = precision_score(y_test, model.predict(X_test_scaled))
+            ap = report['binary_precision']
             ax.text(0.05, 0.05, f'Average Precision: {ap:.3f}', transform=ax.transAxes,
                     bbox=dict(facecolor='white', alpha=0.8))
         elif viz_type.lower() == "model_metrics":
-            if not all(k in data for k in ['X_test_scaled', 'y_test', 'model']):
+            if report is None:
                 return None
-            model = data['model']
-            X_test_scaled = data['X_test_scaled']
-            y_test = data['y_test']
-            y_pred = model.predict(X_test_scaled)
-            accuracy = accuracy_score(y_test, y_pred)
-            f1 = f1_score(y_test, y_pred, average='weighted')
-            precision = precision_score(y_test, y_pred, average='weighted')
-            recall = recall_score(y_test, y_pred, average='weighted')
-            if len(model.classes_) == 2:
-                try:
-                    y_prob = model.predict_proba(X_test_scaled)[:, 1]
-                    auc_score = roc_auc_score(y_test, y_prob)
-                except:
-                    auc_score = 0
-            else:
-                auc_score = 0
+            accuracy, f1, precision, recall, auc_score = scalar_metrics(report).values()
             metrics = ['Accuracy', 'F1 Score', 'Precision', 'Recall', 'AUC-ROC']
             values = [accuracy, f1, precision, recall, auc_score]
             bars = ax.bar(metrics, values, color=['#4CAF50', '#2196F3', '#FFC107', '#9C27B0', '#FF5722'])
@@ -884,227 +1380,2256 @@ def create_visualization(viz_type, data, figsize=(10, 8), save_path=None):
             plt.close(fig)
         return None
 
+# Visualization cache
+def cached_visualization(viz_type, data, model_version, figsize=(10, 8)):
+    version = model_version or 'current'
+    version_dir = os.path.join(VIZ_CACHE_DIR, version)
+    image_path = os.path.join(version_dir, f'{viz_type}.png')
+    url = f'/static/images/cache/{version}/{viz_type}.png'
+    if os.path.exists(image_path):
+        try:
+            os.utime(version_dir)
+        except OSError:
+            pass
+        return url
+    tmp_path = None
+    try:
+        os.makedirs(version_dir, exist_ok=True)
+        # Render to a private file and rename so concurrent viewers never read a partial image
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{viz_type}-', suffix='.png', dir=version_dir)
+        os.close(fd)
+        start = time.perf_counter()
+        fig = create_visualization(viz_type, data, figsize=figsize, save_path=tmp_path)
+        VISUALIZATION_LATENCY.observe((viz_type,), time.perf_counter() - start)
+        if not fig:
+            return None
+        load_pyplot().close(fig)
+        if os.path.getsize(tmp_path) == 0:
+            return None
+        os.replace(tmp_path, image_path)
+        tmp_path = None
+    except OSError:
+        return None
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict_visualization_cache(keep=version)
+    return url
+
+def evict_visualization_cache(keep=None):
+    try:
+        versions = [entry for entry in os.scandir(VIZ_CACHE_DIR) if entry.is_dir()]
+    except OSError:
+        return
+    versions.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    cutoff = time.time() - VIZ_CACHE_MIN_AGE
+    stale = [entry for entry in versions if entry.name != keep][max(VIZ_CACHE_VERSIONS - 1, 0):]
+    for entry in stale:
+        if entry.stat().st_mtime > cutoff:
+            continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+# Persisted models, each unpickled on first access so serving only imports what the best model needs
+class ArtifactModels(Mapping):
+    def __init__(self, path, model_files):
+        self.path = path
+        self.model_files = model_files
+        self.loaded = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        if name not in self.loaded:
+            filename = self.model_files[name]
+            with self.lock:
+                if name not in self.loaded:
+                    # Unpickling imports the estimator's library; it is reported alongside the lazy imports
+                    before = set(sys.modules)
+                    start = time.perf_counter()
+                    model = joblib.load(os.path.join(self.path, filename))
+                    library = type(model).__module__.partition('.')[0]
+                    if library not in before:
+                        IMPORT_TIMES[f"{library} (unpickling {name})"] = time.perf_counter() - start
+                    self.loaded[name] = model
+        return self.loaded[name]
+
+    def __iter__(self):
+        return iter(self.model_files)
+
+    def __len__(self):
+        return len(self.model_files)
+
+# NumPy-only scoring for the exported best model. Linear models keep their coefficients with the scaler
+# folded in; tree ensembles are flattened into node arrays and traversed for all trees and rows at once.
+class NativeModel:
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.kind = str(arrays['kind'])
+        # Units of contributions(): the forest averages probabilities, the other two add up log-odds
+        self.output_scale = 'probability' if self.kind == 'forest' else 'log_odds'
+        self.classes_ = arrays['classes']
+        self.scale_mean = arrays['scale_mean']
+        self.scale_scale = arrays['scale_scale']
+        # Zero-argument loader for the original estimator, set once the export is verified and served
+        self.batch_estimator = None
+        if self.kind == 'linear':
+            self.coef_ = arrays['coef'].reshape(1, -1)
+            self.intercept_ = arrays['intercept']
+            # Scaler folded into the weights: (x - mean) / scale . w + b == x . (w / scale) + (b - mean . w / scale)
+            self.raw_coef = arrays['coef'] / self.scale_scale
+            self.raw_intercept = float(arrays['intercept'][0] - self.scale_mean @ self.raw_coef)
+        else:
+            self.feature_importances_ = arrays['feature_importances']
+            self.roots = arrays['roots']
+            self.feature = arrays['feature'].astype(np.intp)
+            self.threshold = arrays['threshold']
+            # Children interleaved as [left, right] per node so a step is a single gather
+            self.children = np.column_stack([arrays['left'], arrays['right']]).ravel()
+            self.default_left = arrays['default_left']
+            self.value = arrays['value']
+            self.node_value = arrays['node_value']
+            self.depth = int(arrays['depth'])
+            self.base_margin = float(arrays['base_margin'])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **self.arrays)
+
+    @classmethod
+    def export(cls, model, scale_mean, scale_scale):
+        arrays = {'classes': np.asarray(model.classes_), 'scale_mean': scale_mean, 'scale_scale': scale_scale}
+        model_type = type(model).__name__
+        if model_type == 'LogisticRegression':
+            arrays.update(kind='linear', coef=model.coef_[0].astype(np.float64),
+                          intercept=model.intercept_.astype(np.float64))
+        elif model_type == 'RandomForestClassifier':
+            trees = []
+            for estimator in model.estimators_:
+                tree = estimator.tree_
+                counts = tree.value[:, 0, :]
+                trees.append((tree.children_left, tree.children_right, tree.feature, tree.threshold,
+                              np.zeros(tree.node_count, dtype=bool), counts[:, 1] / counts.sum(axis=1),
+                              tree.weighted_n_node_samples))
+            arrays.update(kind='forest', base_margin=0.0,
+                          feature_importances=model.feature_importances_.astype(np.float64))
+            arrays.update(cls.pack_trees(trees, np.float64))
+        elif model_type == 'XGBClassifier':
+            booster = model.get_booster()
+            dump = json.loads(booster.save_raw('json'))
+            learner = dump['learner']
+            if learner['objective']['name'] != 'binary:logistic':
+                raise ValueError(f"Unsupported XGBoost objective {learner['objective']['name']}")
+            trees = []
+            for tree in learner['gradient_booster']['model']['trees']:
+                left = np.asarray(tree['left_children'], dtype=np.int64)
+                conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+                trees.append((left, np.asarray(tree['right_children'], dtype=np.int64),
+                              np.asarray(tree['split_indices'], dtype=np.int64), conditions,
+                              np.asarray(tree['default_left'], dtype=bool), conditions.astype(np.float64),
+                              np.asarray(tree['sum_hessian'], dtype=np.float64)))
+            base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+            arrays.update(kind='boosted', base_margin=np.log(base_score / (1.0 - base_score)),
+                          feature_importances=model.feature_importances_.astype(np.float64))
+            arrays.update(cls.pack_trees(trees, np.float32))
+        else:
+            raise ValueError(f"No native export for {model_type}")
+        return cls(arrays)
+
+    @staticmethod
+    def pack_trees(trees, threshold_dtype):
+        # Concatenates per-tree node arrays into one table; leaves point at themselves so every
+        # row can take the same number of steps regardless of where its path ends
+        offsets = np.cumsum([0] + [len(tree[0]) for tree in trees])
+        left, right, feature, threshold, default_left, value, node_value = ([] for _ in range(7))
+        depth = 0
+        for offset, (tree_left, tree_right, tree_feature, tree_threshold, tree_default, tree_value,
+                     tree_cover) in zip(offsets, trees):
+            nodes = np.arange(len(tree_left))
+            leaf = tree_left < 0
+            # Internal nodes level by level from the root, so depth and the means take one array step per level
+            levels = []
+            frontier = nodes[:1]
+            while True:
+                frontier = frontier[~leaf[frontier]]
+                if not len(frontier):
+                    break
+                levels.append(frontier)
+                frontier = np.concatenate([tree_left[frontier], tree_right[frontier]])
+            left.append(np.where(leaf, nodes, tree_left) + offset)
+            right.append(np.where(leaf, nodes, tree_right) + offset)
+            feature.append(np.where(leaf, 0, tree_feature))
+            threshold.append(np.where(leaf, 0, tree_threshold).astype(threshold_dtype))
+            default_left.append(tree_default)
+            value.append(np.where(leaf, tree_value, 0.0))
+            depth = max(depth, len(levels))
+            # Expected output at every node: the cover-weighted mean of its leaves, filled in bottom-up
+            mean = np.where(leaf, tree_value, 0.0).astype(np.float64)
+            for internal in reversed(levels):
+                node_left, node_right = tree_left[internal], tree_right[internal]
+                mean[internal] = (mean[node_left] * tree_cover[node_left] + mean[node_right] * tree_cover[node_right]) \
+                    / (tree_cover[node_left] + tree_cover[node_right])
+            node_value.append(mean)
+        return {
+            'roots': offsets[:-1].astype(np.int64),
+            'left': np.concatenate(left).astype(np.int64),
+            'right': np.concatenate(right).astype(np.int64),
+            'feature': np.concatenate(feature).astype(np.int64),
+            'threshold': np.concatenate(threshold),
+            'default_left': np.concatenate(default_left),
+            'value': np.concatenate(value),
+            'node_value': np.concatenate(node_value),
+            'depth': depth
+        }
+
+    def step(self, flat, offsets, nodes):
+        # Advances a node matrix of shape (n_trees, n_rows) one level for every tree at once.
+        # Both libraries compare float32 inputs: sklearn splits on <=, XGBoost on < with a default branch for NaN.
+        values = np.take(flat, offsets + np.take(self.feature, nodes))
+        thresholds = np.take(self.threshold, nodes)
+        if self.kind == 'forest':
+            go_right = values > thresholds
+        else:
+            go_right = np.where(np.isnan(values), ~np.take(self.default_left, nodes), values >= thresholds)
+        return np.take(self.children, 2 * nodes + go_right)
+
+    def leaves(self, X_scaled):
+        X = np.asarray(X_scaled, dtype=np.float32).astype(self.threshold.dtype)
+        flat = X.ravel()
+        offsets = np.arange(len(X)) * X.shape[1]
+        nodes = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.depth):
+            nodes = self.step(flat, offsets, nodes)
+        return nodes
+
+    def contributions(self, X_scaled):
+        # Per-feature contributions that add up, with the returned base, to the model output: log-odds for the
+        # linear and boosted models, probability for the forest. Linear ones are coefficient x scaled value;
+        # trees credit each split's feature with the change in expected output along the row's path (Saabas),
+        # accumulated for all trees and rows of a block with one bincount per level.
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        if self.kind == 'linear':
+            return float(self.intercept_[0]), X_scaled * self.coef_[0]
+        n_rows, n_features = X_scaled.shape
+        total = np.empty((n_rows, n_features), dtype=np.float64)
+        for start in range(0, n_rows, NATIVE_BLOCK_ROWS):
+            X = X_scaled[start:start + NATIVE_BLOCK_ROWS].astype(np.float32).astype(self.threshold.dtype)
+            flat = X.ravel()
+            offsets = np.arange(len(X)) * n_features
+            nodes = np.repeat(self.roots[:, None], len(X), axis=1)
+            block = np.zeros(len(X) * n_features, dtype=np.float64)
+            for _ in range(self.depth):
+                children = self.step(flat, offsets, nodes)
+                change = np.take(self.node_value, children) - np.take(self.node_value, nodes)
+                block += np.bincount((offsets + np.take(self.feature, nodes)).ravel(), weights=change.ravel(),
+                                     minlength=len(block))
+                nodes = children
+            total[start:start + NATIVE_BLOCK_ROWS] = block.reshape(len(X), n_features)
+        base = np.take(self.node_value, self.roots)
+        if self.kind == 'forest':
+            return float(base.mean()), total / len(self.roots)
+        return float(base.sum() + self.base_margin), total
+
+    def positive_proba(self, X_scaled):
+        if self.kind == 'linear':
+            margin = np.asarray(X_scaled, dtype=np.float64) @ self.coef_[0] + self.intercept_[0]
+            return 1.0 / (1.0 + np.exp(-margin))
+        if self.batch_estimator is not None and len(X_scaled) > NATIVE_BATCH_MAX_ROWS:
+            # The tree walk is 5-7x slower than sklearn/XGBoost from about a thousand rows up
+            return self.batch_estimator().predict_proba(X_scaled)[:, 1]
+        # Tree traversal runs in row blocks so the node matrix stays cache-sized
+        X_scaled = np.asarray(X_scaled)
+        total = np.empty(len(X_scaled), dtype=np.float64)
+        for start in range(0, len(X_scaled), NATIVE_BLOCK_ROWS):
+            block = X_scaled[start:start + NATIVE_BLOCK_ROWS]
+            total[start:start + NATIVE_BLOCK_ROWS] = np.take(self.value, self.leaves(block)).sum(axis=0)
+        if self.kind == 'forest':
+            return total / len(self.roots)
+        return 1.0 / (1.0 + np.exp(-(total + self.base_margin)))
+
+    def predict_proba(self, X_scaled):
+        probability = self.positive_proba(X_scaled)
+        return np.column_stack([1.0 - probability, probability])
+
+    def score_raw(self, X_raw):
+        # Positive-class probability for unscaled feature rows
+        if self.kind == 'linear':
+            margin = np.asarray(X_raw, dtype=np.float64) @ self.raw_coef + self.raw_intercept
+            return 1.0 / (1.0 + np.exp(-margin))
+        return self.positive_proba((np.asarray(X_raw, dtype=np.float64) - self.scale_mean) / self.scale_scale)
+
+# Fitted preprocessing shared by training, single-patient and batch inference: fill values, categorical
+# fallbacks, one-hot levels and standard-scaling statistics. Transforms write into one preallocated matrix.
+class Preprocessor:
+    def __init__(self, state=None):
+        self.columns = []
+        self.encoded_columns = []
+        self.fill_values = {}
+        self.valid_codes = {}
+        self.fallbacks = {}
+        self.levels = {}
+        self.n_samples = 0
+        self.mean = None
+        self.var = None
+        self.std = None
+        if state is not None:
+            self.columns = list(state['columns'])
+            self.fill_values = dict(state['fill_values'])
+            self.valid_codes = {col: list(codes) for col, codes in state['valid_codes'].items()}
+            self.fallbacks = dict(state['fallbacks'])
+            self.levels = {col: list(levels) for col, levels in state['levels'].items()}
+            self.set_statistics(state['n_samples'], np.asarray(state['mean'], dtype=np.float64),
+                                np.asarray(state['var'], dtype=np.float64))
+        self.build_layout()
+
+    def state(self):
+        # Builtins and arrays only, so artifacts load without this module's classes or sklearn
+        return {
+            'columns': self.columns,
+            'fill_values': self.fill_values,
+            'valid_codes': self.valid_codes,
+            'fallbacks': self.fallbacks,
+            'levels': self.levels,
+            'n_samples': self.n_samples,
+            'mean': self.mean,
+            'var': self.var
+        }
+
+    def build_layout(self):
+        # Numeric columns keep their order and one-hot columns follow, matching pd.get_dummies
+        numeric = [col for col in self.columns if col not in self.levels]
+        self.encoded_columns = numeric + [f"{col}_{level}" for col, levels in self.levels.items() for level in levels]
+        self.positions = {col: i for i, col in enumerate(numeric)}
+        self.level_positions = {}
+        offset = len(numeric)
+        for col, levels in self.levels.items():
+            self.level_positions[col] = {str(level): offset + i for i, level in enumerate(levels)}
+            offset += len(levels)
+        # Encoded-to-source column indicator, so per-column contributions sum back to the patient's fields
+        self.sources = np.zeros((len(self.encoded_columns), len(self.columns)))
+        for col, position in self.positions.items():
+            self.sources[position, self.columns.index(col)] = 1.0
+        for col, positions in self.level_positions.items():
+            self.sources[list(positions.values()), self.columns.index(col)] = 1.0
+        self.valid_code_sets = {col: set(codes) for col, codes in self.valid_codes.items()}
+
+    def fit_encoding(self, frame):
+        self.columns = frame.columns.tolist()
+        numeric = [col for col in self.columns if pd.api.types.is_numeric_dtype(frame[col])]
+        self.fill_values = {col: float(value) for col, value in frame[numeric].median().items()}
+        self.valid_codes = {}
+        self.fallbacks = {}
+        self.levels = {}
+        for col in self.columns:
+            values = frame[col]
+            if col not in numeric:
+                self.fill_values[col] = values.mode()[0]
+                self.levels[col] = sorted(values.dropna().unique().tolist())
+            elif col in CATEGORICAL_OPTIONS:
+                # Out-of-range codes are replaced by the most frequent valid code
+                codes = [float(option) for option in CATEGORICAL_OPTIONS[col]]
+                valid = values[values.isin(codes)]
+                self.valid_codes[col] = codes
+                self.fallbacks[col] = float(valid.mode()[0]) if len(valid) else codes[0]
+        self.build_layout()
+        return self
+
+    def set_statistics(self, n_samples, mean, var):
+        self.n_samples = n_samples
+        self.mean = mean
+        self.var = var
+        # Same rule as StandardScaler: constant columns are left unscaled
+        std = np.sqrt(var)
+        std[std < 10 * np.finfo(np.float64).eps] = 1.0
+        self.std = std
+
+    def update_scaling(self, encoded):
+        # Merges a batch into the running mean and variance (Chan et al.), so earlier rows are never reread
+        encoded = np.asfortranarray(encoded)
+        if len(encoded) == 0:
+            return self
+        batch_mean = encoded.mean(axis=0)
+        batch_var = np.square(encoded - batch_mean).mean(axis=0)
+        total = self.n_samples + len(encoded)
+        delta = batch_mean - self.mean
+        mean = self.mean + delta * len(encoded) / total
+        var = (self.var * self.n_samples + batch_var * len(encoded)
+               + np.square(delta) * self.n_samples * len(encoded) / total) / total
+        self.set_statistics(total, mean, var)
+        return self
+
+    def fit_scaling(self, encoded):
+        # Column-major input makes the reductions pairwise per column, as in StandardScaler
+        encoded = np.asfortranarray(encoded)
+        mean = encoded.mean(axis=0)
+        self.set_statistics(len(encoded), mean, np.square(encoded - mean).mean(axis=0))
+        return self
+
+    def fit(self, frame, rows=None):
+        self.fit_encoding(frame)
+        return self.fit_scaling(self.encode(frame if rows is None else frame.loc[rows]))
+
+    def encode(self, frame):
+        # Unscaled model-input matrix for a frame of original columns, column-major so each column is one write
+        n_rows = len(frame)
+        matrix = np.zeros((n_rows, len(self.encoded_columns)), dtype=np.float64, order='F')
+        for col, position in self.positions.items():
+            column = matrix[:, position]
+            if col not in frame.columns:
+                column[:] = self.fill_values.get(col, np.nan)
+                continue
+            column[:] = frame[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            missing = np.isnan(column)
+            if missing.any():
+                column[missing] = self.fill_values.get(col, np.nan)
+            if col in self.valid_codes:
+                invalid = ~np.isin(column, self.valid_codes[col])
+                if invalid.any():
+                    column[invalid] = self.fallbacks[col]
+        for col, levels in self.levels.items():
+            values = frame[col] if col in frame.columns else pd.Series([self.fill_values[col]] * n_rows)
+            codes = pd.Categorical(values.fillna(self.fill_values[col]), categories=levels).codes
+            known = np.flatnonzero(codes >= 0)
+            matrix[known, self.level_positions[col][str(levels[0])] + codes[known]] = 1.0
+        return matrix
+
+    def scale(self, matrix):
+        # In place; same arithmetic as StandardScaler.transform
+        matrix -= self.mean
+        matrix /= self.std
+        return matrix
+
+    def transform(self, frame):
+        return self.scale(self.encode(frame))
+
+    def transform_row(self, patient_data):
+        # Single patient straight from the validated dict into a scaled (1, n) row, without pandas
+        row = np.zeros(len(self.encoded_columns), dtype=np.float64)
+        for col in self.columns:
+            value = patient_data.get(col)
+            if value is None:
+                value = self.fill_values.get(col)
+            if col in self.level_positions:
+                position = self.level_positions[col].get(str(value))
+                if position is not None:
+                    row[position] = 1.0
+                continue
+            if not isinstance(value, NUMERIC_TYPES):
+                raise ValueError(f"Non-numeric value for {col}")
+            if col in self.valid_code_sets and value not in self.valid_code_sets[col]:
+                value = self.fallbacks[col]
+            row[self.positions[col]] = value
+        return self.scale(row).reshape(1, -1)
+
+# LRU cache with expiry for predicted probabilities; cleared whenever the model it was filled from changes
+class PredictionCache:
+    def __init__(self, max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.model = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, model, key):
+        now = time.monotonic()
+        with self.lock:
+            if model is not self.model:
+                self.entries.clear()
+                self.model = model
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, model, key, value):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            if model is not self.model:
+                return
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+# Collects rows from concurrent requests for up to max_wait_ms or max_rows and scores them as one matrix
+class MicroBatcher:
+    def __init__(self, max_wait_ms=MICRO_BATCH_WAIT_MS, max_rows=MICRO_BATCH_MAX_ROWS):
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max(1, max_rows)
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_size = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = {}
+
+    def predict_proba(self, model, row):
+        if self.worker is None:
+            with self.lock:
+                if self.worker is None:
+                    self.worker = threading.Thread(target=self.run, name='micro-batcher', daemon=True)
+                    self.worker.start()
+        future = Future()
+        self.queue.put((model, row, future))
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future.result()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.score(batch)
+
+    def score(self, batch):
+        # Requests can straddle a model swap, so rows are grouped by the model they were encoded for
+        groups = {}
+        for model, row, future in batch:
+            groups.setdefault(id(model), (model, []))[1].append((row, future))
+        for model, items in groups.values():
+            try:
+                probabilities = model.predict_proba(np.vstack([row for row, _ in items]))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), probability in zip(items, probabilities):
+                future.set_result(probability)
+        size = len(batch)
+        bucket = 1 << (size - 1).bit_length()
+        with self.lock:
+            self.batches += 1
+            self.rows += size
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_rows": self.max_rows,
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "rows": self.rows,
+                "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "batch_size_histogram": {f"<={bucket}": count for bucket, count in sorted(self.batch_sizes.items())}
+            }
+
+micro_batcher = MicroBatcher() if MICRO_BATCH_WAIT_MS > 0 else None
+
+# Combines the probabilities of every trained model. Soft voting averages them; stacking applies a logistic
+# regression fitted on out-of-fold probabilities and needs every model, so it falls back to the average when
+# one was skipped or failed. The best model is always waited for, so a request never ends up without a score.
+# A skipped member cannot be interrupted and keeps its executor thread until it finishes, so under a budget a member
+# still busy with an earlier request is skipped up front instead of queueing more work behind it.
+class Ensemble:
+    def __init__(self, models, primary, method=ENSEMBLE_METHOD, weights=None):
+        self.models = models
+        self.primary = primary
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.weights = weights if weights is not None and list(weights['names']) == list(models) else None
+        self.method = 'stacking' if method == 'stacking' and self.weights is not None else 'soft_vote'
+
+    def combine(self, probabilities):
+        if self.method == 'stacking' and len(probabilities) == len(self.models):
+            stacked = np.column_stack([probabilities[name] for name in self.models])
+            return 1.0 / (1.0 + np.exp(-(stacked @ self.weights['coef'] + self.weights['intercept'])))
+        return np.mean([probabilities[name] for name in probabilities], axis=0)
+
+    def score_model(self, name, X_scaled):
+        start = time.perf_counter()
+        probability = self.models[name].predict_proba(X_scaled)[:, 1]
+        ENSEMBLE_LATENCY.observe((name,), time.perf_counter() - start)
+        return probability
+
+    def score(self, X_scaled, budget=None):
+        futures = {}
+        with self.lock:
+            for name in self.models:
+                pending = self.pending.get(name)
+                if budget is not None and name != self.primary and pending is not None and not pending.done():
+                    continue
+                futures[name] = self.pending[name] = ensemble_executor.submit(self.score_model, name, X_scaled)
+        done, _ = wait(futures.values(), timeout=budget)
+        probabilities = {}
+        skipped = []
+        for name in self.models:
+            future = futures.get(name)
+            if name == self.primary:
+                probabilities[name] = future.result()
+                continue
+            if future in done:
+                if future.exception() is None:
+                    probabilities[name] = future.result()
+                    continue
+                app.logger.warning("Ensemble member %s failed: %s", name, future.exception())
+            elif future is not None:
+                future.cancel()
+            skipped.append(name)
+            ENSEMBLE_SKIPS.inc((name,))
+        return self.combine(probabilities), probabilities, skipped
+
+    def agreement(self, probabilities, prediction, threshold=0.5):
+        # Share of the scored models whose own prediction matches the ensemble's
+        votes = np.column_stack([probabilities[name] >= threshold for name in probabilities])
+        return (votes == np.asarray(prediction, dtype=bool)[:, None]).mean(axis=1)
+
+ensemble_executor = ThreadPoolExecutor(max_workers=2 * len(MODEL_CLASSES),
+                                       thread_name_prefix='ensemble') if ENSEMBLE_METHOD else None
+
+# Prometheus text-format metrics. Recording is a bisect and three additions under a lock; the
+# exposition is only built when /metrics is scraped.
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+class Counter:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{format_labels(self.label_names, labels)} {value}')
+        return lines
+
+class Histogram:
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        if not METRICS_ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        names = self.label_names + ('le',)
+        with self.lock:
+            for labels, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{self.name}_bucket{format_labels(names, labels + (repr(bound),))} {cumulative}')
+                lines.append(f'{self.name}_bucket{format_labels(names, labels + ("+Inf",))} {count}')
+                lines.append(f'{self.name}_sum{format_labels(self.label_names, labels)} {total}')
+                lines.append(f'{self.name}_count{format_labels(self.label_names, labels)} {count}')
+        return lines
+
+REQUEST_LATENCY = Histogram('healthcare_ai_request_duration_seconds',
+                            'Time from request start to response headers, per route.', ('route', 'method'))
+REQUESTS = Counter('healthcare_ai_requests_total', 'Requests handled, per route and status code.',
+                   ('route', 'method', 'status'))
+STAGE_LATENCY = Histogram('healthcare_ai_stage_duration_seconds',
+                          'Time spent in instrumented hot-path stages.', ('stage',))
+VISUALIZATION_LATENCY = Histogram('healthcare_ai_visualization_duration_seconds',
+                                  'Time spent in create_visualization, per plot type.', ('plot',))
+ERRORS = Counter('healthcare_ai_errors_total', 'Exceptions caught and turned into error responses, per stage.',
+                 ('stage',))
+PROFILES = Counter('healthcare_ai_profiles_total', 'Requests captured by the sampling profiler, per route.',
+                   ('route',))
+ENSEMBLE_LATENCY = Histogram('healthcare_ai_ensemble_model_duration_seconds',
+                             'Time for one ensemble member to score a request or batch chunk, per model.', ('model',))
+ENSEMBLE_SKIPS = Counter('healthcare_ai_ensemble_skipped_total',
+                         'Ensemble members left out of a vote for missing the latency budget, per model.', ('model',))
+METRICS = [REQUEST_LATENCY, REQUESTS, STAGE_LATENCY, VISUALIZATION_LATENCY, ERRORS, PROFILES, ENSEMBLE_LATENCY,
+           ENSEMBLE_SKIPS]
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    start = g.get('request_start')
+    if start is not None and request.endpoint != 'metrics':
+        route = request.endpoint or 'unmatched'
+        REQUEST_LATENCY.observe((route, request.method), time.perf_counter() - start)
+        REQUESTS.inc((route, request.method, str(response.status_code)))
+    return response
+
+# Samples the stack of one request thread from a side thread, so the profiled code runs unmodified
+class RequestProfiler(threading.Thread):
+    def __init__(self, thread_id, interval):
+        super().__init__(name='request-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.stacks = {}
+        self.samples = 0
+        self.started = time.perf_counter()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.samples += 1
+
+    def finish(self):
+        self.stop_event.set()
+        self.join()
+        return time.perf_counter() - self.started
+
+    def save(self, path):
+        # One "frame;frame;frame count" line per distinct stack
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp_path, path)
+
+def evict_profiles():
+    try:
+        names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith('.folded'))
+    except OSError:
+        return
+    for name in names[:max(len(names) - PROFILE_MAX_FILES, 0)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass
+
+@app.before_request
+def start_profiler():
+    requested = PROFILE_HEADER and request.headers.get('X-Profile') == '1'
+    if not requested and not (PROFILE_RATE > 0 and random.random() < PROFILE_RATE):
+        return
+    if request.endpoint in (None, 'static', 'metrics'):
+        return
+    profiler = RequestProfiler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000.0)
+    profiler.profile_id = (f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{request.endpoint}-"
+                           f"{os.getpid()}-{threading.get_ident() % 100000}")
+    g.profiler = profiler
+    profiler.start()
+
+@app.after_request
+def tag_profiled_response(response):
+    profiler = g.get('profiler')
+    if profiler is not None:
+        response.headers['X-Profile-Id'] = profiler.profile_id
+    return response
+
+@app.teardown_request
+def stop_profiler(exc):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return
+    duration = profiler.finish()
+    try:
+        profiler.save(os.path.join(PROFILE_DIR, profiler.profile_id + '.folded'))
+    except OSError:
+        app.logger.exception("Could not write profile %s", profiler.profile_id)
+        return
+    PROFILES.inc((request.endpoint,))
+    app.logger.info("Profiled %s: %.1f ms, %d samples -> %s.folded", request.endpoint, duration * 1000,
+                    profiler.samples, profiler.profile_id)
+    evict_profiles()
+
+def page_values(values):
+    # float32 columns go through their shortest repr so 2.3 is shown as 2.3, not 2.299999952316284
+    if values.dtype == np.float32:
+        return [float(value) for value in values.astype(str)]
+    return values.tolist()
+
+# Columnar dataset store. Whole-number columns get the smallest integer type that holds them, other numbers
+# become float32 when every value survives the round trip (float64 otherwise, so 2.3 still scores as the CSV's
+# 2.3) and text columns become integer codes; loading maps the files instead of parsing the CSV.
+def compact_column(values):
+    if values.dtype.kind in 'biuf':
+        array = values.to_numpy()
+        whole = array.dtype.kind in 'biu' or (len(array) > 0 and np.isfinite(array).all()
+                                             and np.array_equal(array, np.floor(array)))
+        if not whole:
+            narrow = array.astype(np.float32)
+            if np.array_equal(narrow.astype(array.dtype), array, equal_nan=True):
+                return narrow, None
+            return array, None
+        for dtype in (np.uint8, np.int8, np.uint16, np.int16, np.int32, np.int64):
+            if np.iinfo(dtype).min <= array.min() and array.max() <= np.iinfo(dtype).max:
+                return array.astype(dtype), None
+    codes, categories = pd.factorize(values.astype(object).where(values.notna()), sort=True)
+    dtype = np.int8 if len(categories) < 128 else np.int16 if len(categories) < 32768 else np.int32
+    return codes.astype(dtype), [str(category) for category in categories]
+
+def dataset_store_key(path):
+    stat = os.stat(path)
+    source = os.path.abspath(path)
+    key = f"{DATASET_STORE_FORMAT}:{source}:{stat.st_mtime_ns}:{stat.st_size}"
+    return source, hashlib.sha256(key.encode()).hexdigest()[:16]
+
+def ingest_dataset(path, store_path, source):
+    frame = pd.read_csv(path)
+    tmp_path = f"{store_path}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(tmp_path, exist_ok=True)
+        columns = []
+        for i, col in enumerate(frame.columns):
+            array, categories = compact_column(frame[col])
+            np.save(os.path.join(tmp_path, f'{i}.npy'), array)
+            columns.append({'name': col, 'file': f'{i}.npy', 'categories': categories})
+        with open(os.path.join(tmp_path, 'columns.json'), 'w') as f:
+            json.dump({'format': DATASET_STORE_FORMAT, 'source': source, 'rows': len(frame), 'columns': columns}, f)
+        os.rename(tmp_path, store_path)
+    except OSError:
+        # Another worker published the same store first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def evict_dataset_stores(source, keep):
+    # Stores built from earlier versions of the same file; workers still mapping them keep their pages
+    for entry in os.scandir(DATASET_STORE_DIR):
+        if entry.name == keep or not entry.is_dir():
+            continue
+        try:
+            with open(os.path.join(entry.path, 'columns.json')) as f:
+                stale = json.load(f).get('source') == source
+        except (OSError, ValueError):
+            continue
+        if stale:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+def load_dataset_store(store_path):
+    with open(os.path.join(store_path, 'columns.json')) as f:
+        layout = json.load(f)
+    columns = {}
+    for entry in layout['columns']:
+        array = np.load(os.path.join(store_path, entry['file']), mmap_mode='r')
+        if entry['categories'] is not None:
+            array = pd.Categorical.from_codes(array, entry['categories'])
+        columns[entry['name']] = array
+    return pd.DataFrame(columns, copy=False)
+
+def read_dataset(path):
+    if not DATASET_STORE:
+        return pd.read_csv(path)
+    source, key = dataset_store_key(path)
+    store_path = os.path.join(DATASET_STORE_DIR, key)
+    try:
+        if not os.path.isdir(store_path):
+            os.makedirs(DATASET_STORE_DIR, exist_ok=True)
+            ingest_dataset(path, store_path, source)
+            evict_dataset_stores(source, key)
+        return load_dataset_store(store_path)
+    except OSError:
+        return pd.read_csv(path)
+
+# Incremental training helpers
+def hash_dataset(path, base=None):
+    # SHA-256 of the file in one pass. Given the (size, digest) of an earlier version, also tells whether this
+    # file is that version with whole lines appended, without reading the earlier rows a second time
+    content = hashlib.sha256()
+    prefix = hashlib.sha256()
+    size = 0
+    last = b''
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            if base is not None and size < base[0]:
+                head = block[:base[0] - size]
+                prefix.update(head)
+                last = head[-1:]
+            content.update(block)
+            size += len(block)
+    appended = base is not None and size > base[0] and last == b'\n' and prefix.hexdigest() == base[1]
+    return size, content.hexdigest(), appended
+
+def distinct_values(matrix, previous=None):
+    # Sorted distinct values of every column, merged into an earlier generation's sets
+    values = [np.unique(column) for column in matrix.T]
+    if previous is not None:
+        values = [np.union1d(old, new) for old, new in zip(previous, values)]
+    return values
+
+def rebase_thresholds(thresholds, features, old, new, values, inclusive, dtype):
+    # Each split keeps its relative position between the dataset values on either side of it, so every value
+    # keeps its branch. Both libraries compare float32 inputs, so neighbours are looked up among the float32
+    # images of the values. Inclusive splits send x <= threshold left (sklearn), others x < threshold (XGBoost,
+    # which also stores float32 thresholds).
+    mapped = (thresholds * old.std[features] + old.mean[features] - new.mean[features]) / new.std[features]
+    for feature in np.unique(features):
+        at = np.flatnonzero(features == feature)
+        raw = values[feature]
+        before = ((raw - old.mean[feature]) / old.std[feature]).astype(np.float32).astype(np.float64)
+        after = ((raw - new.mean[feature]) / new.std[feature]).astype(np.float32).astype(np.float64)
+        position = np.searchsorted(before, thresholds[at], side='right' if inclusive else 'left')
+        # Splits outside the range of the values keep the linear mapping
+        inside = (position > 0) & (position < len(raw))
+        lower, upper = position[inside] - 1, position[inside]
+        fraction = (thresholds[at[inside]] - before[lower]) / (before[upper] - before[lower])
+        mapped[at[inside]] = after[lower] + fraction * (after[upper] - after[lower])
+        # Rounding can carry a split onto or past a neighbour, most often when it sits on a value itself;
+        # clamping into the gap between the neighbours keeps the branch of every value
+        below = np.append(-np.inf, after)[position].astype(dtype)
+        above = np.append(after, np.inf)[position].astype(dtype)
+        if inclusive:
+            above = np.nextafter(above, dtype(-np.inf))
+        else:
+            below = np.nextafter(below, dtype(np.inf))
+        mapped[at] = np.clip(mapped[at].astype(dtype), below, above)
+    return mapped.astype(dtype)
+
+def linear_transform(preprocessor):
+    # Maps (coef, intercept) on scaled inputs to the same model on raw inputs: raw = transform @ scaled
+    n = len(preprocessor.mean)
+    transform = np.zeros((n + 1, n + 1))
+    transform[np.arange(n), np.arange(n)] = 1.0 / preprocessor.std
+    transform[n, :n] = -preprocessor.mean / preprocessor.std
+    transform[n, n] = 1.0
+    return transform
+
+def logistic_terms(theta, X_scaled, y):
+    # Gradient and Hessian of the summed log-loss of [X, 1] @ theta
+    design = np.column_stack([X_scaled, np.ones(len(X_scaled))])
+    probability = 1.0 / (1.0 + np.exp(-(design @ theta)))
+    return design.T @ (probability - y), (design * (probability * (1.0 - probability))[:, None]).T @ design
+
+def linear_summary(theta, gradient, hessian, preprocessor):
+    # Second-order summary of the log-loss in raw-input parameters, which the loss depends on alone, so it stays
+    # valid when later generations change the scaling statistics
+    inverse = np.linalg.inv(linear_transform(preprocessor))
+    return {'theta': linear_transform(preprocessor) @ theta, 'gradient': inverse.T @ gradient,
+            'hessian': inverse.T @ hessian @ inverse}
+
+def fit_linear_summary(model, X_scaled, y, preprocessor):
+    theta = np.append(model.coef_[0], model.intercept_[0])
+    gradient, hessian = logistic_terms(theta, X_scaled, np.asarray(y, dtype=np.float64))
+    return linear_summary(theta, gradient, hessian, preprocessor)
+
+def update_linear(model, state, preprocessor, X_added, y_added, max_iter=50):
+    # Newton's method on the L2-penalised objective with the earlier rows replaced by their second-order summary
+    # (a Laplace approximation), so only the appended rows are read. Updates the model in place and returns the
+    # summary for the next generation, or None when the steps do not converge.
+    transform = linear_transform(preprocessor)
+    start = np.linalg.solve(transform, state['theta'])
+    gradient = transform.T @ state['gradient']
+    hessian = transform.T @ state['hessian'] @ transform
+    penalty = np.append(np.ones(len(start) - 1), 0.0)
+    y = np.asarray(y_added, dtype=np.float64)
+    theta = start
+    for _ in range(max_iter):
+        added_gradient, added_hessian = logistic_terms(theta, X_added, y)
+        step = np.linalg.solve(np.diag(penalty) + model.C * (hessian + added_hessian),
+                               penalty * theta + model.C * (gradient + hessian @ (theta - start) + added_gradient))
+        theta = theta - step
+        if np.max(np.abs(step)) < 1e-10:
+            break
+    else:
+        return None
+    model.coef_ = theta[:-1].reshape(1, -1)
+    model.intercept_ = theta[-1:]
+    added_gradient, added_hessian = logistic_terms(theta, X_added, y)
+    return linear_summary(theta, gradient + hessian @ (theta - start) + added_gradient, hessian + added_hessian,
+                          preprocessor)
+
+def rebase_model(model, old, new, values):
+    # Moves a fitted model from one set of scaling statistics to another without changing its predictions:
+    # linear weights absorb the change, tree splits are moved using the sorted raw dataset values per feature
+    model_type = type(model).__name__
+    if model_type == 'LogisticRegression':
+        # w . (x - m0) / s0 + b == (w * s1 / s0) . (x - m1) / s1 + b + w . (m1 - m0) / s0
+        weights = model.coef_[0] / old.std
+        model.intercept_ = model.intercept_ + weights @ (new.mean - old.mean)
+        model.coef_ = (weights * new.std).reshape(1, -1)
+    elif model_type == 'RandomForestClassifier':
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            split = np.flatnonzero(tree.feature >= 0)
+            tree.threshold[split] = rebase_thresholds(tree.threshold[split], tree.feature[split], old, new, values,
+                                                      inclusive=True, dtype=np.float64)
+    elif model_type == 'XGBClassifier':
+        booster = model.get_booster()
+        dump = json.loads(booster.save_raw('json'))
+        for tree in dump['learner']['gradient_booster']['model']['trees']:
+            split = np.flatnonzero(np.asarray(tree['left_children']) >= 0)
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+            conditions[split] = rebase_thresholds(conditions[split], np.asarray(tree['split_indices'])[split], old,
+                                                  new, values, inclusive=False, dtype=np.float32)
+            tree['split_conditions'] = conditions.astype(np.float32).tolist()
+        booster.load_model(bytearray(json.dumps(dump).encode()))
+    else:
+        raise ValueError(f"Cannot rebase {model_type}")
+    return model
+
 # Class entry
 class HealthcareAI:
-    def __init__(self):
+    def __init__(self, previous=None):
         self.dataset = None
         self.features = None
         self.target = None
         self.models = {}
         self.best_model = None
         self.best_model_name = None
-        self.scaler = StandardScaler()
+        self.preprocessor = None
         self.model_accuracies = {}
-        self.X_train = None
-        self.X_test = None
+        self.evaluation = {}
+        self.training_report = {}
         self.y_train = None
         self.y_test = None
         self.X_train_scaled = None
         self.X_test_scaled = None
+        self.X_added_scaled = None
         self.original_columns = []
         self.dummy_columns = []
+        self.model_version = None
+        self.loaded_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self.column_arrays = None
+        self.sort_orders = {}
+        self.train_index = None
+        self.test_index = None
+        self.native_model = None
+        self.native_error = None
+        self.native_members = {}
+        self.ensemble = None
+        self.ensemble_weights = None
+        self.out_of_fold = {}
+        self.calibrator = None
+        self.operating_points = None
+        self.default_threshold = 0.5
+        self.default_operating_point = None
+        self.feature_values = None
+        self.linear_state = None
+        self.lineage = None
+        self.dataset_size = None
+        self.dataset_digest = None
+        self.dataset_appended = False
+        self.prediction_cache = PredictionCache()
         self.load_data()
         if self.dataset is not None:
-            self.preprocess_data()
-            self.train_models()
+            self.hash_dataset(previous)
+            self.model_version = self.artifact_key()
+            if self.load_artifacts():
+                self.preprocess_data(fit_scaler=False)
+            elif INCREMENTAL_TRAINING and self.continue_generation(previous):
+                app.logger.info("Model %s continues %s", self.model_version, previous.model_version)
+            elif not SERVE_ONLY and self.preprocess_data():
+                if self.train_models():
+                    self.export_native()
+                self.save_artifacts()
+            if NATIVE_INFERENCE and self.native_model is not None:
+                self.best_model = self.native_model
+                self.attach_batch_estimator(self.native_model, self.best_model_name)
+            if ENSEMBLE_METHOD and self.best_model is not None:
+                # Every member is loaded now rather than on the first request, in its NumPy form where allowed
+                models = {}
+                for name in self.evaluation:
+                    if name == self.best_model_name:
+                        models[name] = self.best_model
+                    elif NATIVE_INFERENCE and name in self.native_members:
+                        models[name] = self.native_members[name][0]
+                        self.attach_batch_estimator(models[name], name)
+                    elif name in self.models:
+                        models[name] = self.models[name]
+                self.ensemble = Ensemble(models, self.best_model_name, method=ENSEMBLE_METHOD,
+                                         weights=self.ensemble_weights)
+            if OPERATING_POINT and self.best_model is not None:
+                try:
+                    self.default_threshold, sensitivity, specificity = lookup_operating_point(self.operating_points,
+                                                                                             OPERATING_POINT)
+                    self.default_operating_point = {"name": OPERATING_POINT, "sensitivity": sensitivity,
+                                                    "specificity": specificity}
+                except ValueError as e:
+                    app.logger.warning("Ignoring HEALTHCARE_AI_OPERATING_POINT: %s", e)
+
+    def continue_generation(self, previous):
+        # A warm-started generation is stored under a key that includes the version it continues, so only a worker
+        # continuing the same base reuses it; a cold start keeps loading or training a full fit
+        if previous is None or previous.model_version is None or not self.dataset_appended:
+            return False
+        full_version = self.model_version
+        lineage = {'base': previous.model_version, 'incremental': True}
+        self.model_version = self.artifact_key(lineage=lineage)
+        if self.load_artifacts(lineage=lineage):
+            self.preprocess_data(fit_scaler=False)
+            return True
+        if not SERVE_ONLY and self.update_models(previous):
+            self.lineage = lineage
+            # The export is checked on the appended rows only, so the refresh stays proportional to them
+            self.export_native(rows=slice(len(previous.features), None))
+            self.save_artifacts()
+            return True
+        self.model_version = full_version
+        return False
+
+    def attach_batch_estimator(self, native, name):
+        # Resolved on the first large block, so a serve-only worker imports sklearn/XGBoost only when batches arrive
+        if native.kind != 'linear' and name in self.models:
+            models = self.models
+            native.batch_estimator = lambda: models[name]
 
     def load_data(self):
         try:
-            self.dataset = pd.read_csv("heart.csv")
+            self.dataset = read_dataset(DATASET_PATH)
             if self.dataset.empty:
                 return False
             return True
         except Exception:
             return False
 
-    def preprocess_data(self, test_size=0.2):
+    def preprocess_data(self, test_size=0.2, fit_scaler=True, previous=None):
         if self.dataset is None:
             return False
         target_column = 'Target'
         if target_column not in self.dataset.columns:
             return False
-        for col in self.dataset.columns:
-            if self.dataset[col].isnull().sum() > 0:
-                if pd.api.types.is_numeric_dtype(self.dataset[col]):
-                    self.dataset[col].fillna(self.dataset[col].median(), inplace=True)
-                else:
-                    self.dataset[col].fillna(self.dataset[col].mode()[0], inplace=True)
-        for cat_col in CATEGORICAL_OPTIONS.keys():
-            if cat_col in self.dataset.columns:
-                valid_options = set(CATEGORICAL_OPTIONS[cat_col])
-                actual_values = set(self.dataset[cat_col].astype(str))
-                if not actual_values.issubset(valid_options):
-                    self.dataset[cat_col] = self.dataset[cat_col].astype(str).apply(
-                        lambda x: x if x in valid_options else valid_options.pop()
-                    )
         self.target = self.dataset[target_column]
-        self.features = self.dataset.drop(target_column, axis=1)
-        self.original_columns = self.features.columns.tolist()
-        categorical_cols = self.features.select_dtypes(include=['object', 'category']).columns
-        if len(categorical_cols) > 0:
-            self.features = pd.get_dummies(self.features, columns=categorical_cols)
-        self.dummy_columns = self.features.columns.tolist()
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            self.features, self.target, test_size=test_size, random_state=42)
-        self.X_train_scaled = self.scaler.fit_transform(self.X_train)
-        self.X_test_scaled = self.scaler.transform(self.X_test)
+        if self.target.hasnans:
+            self.target = self.target.fillna(self.target.median())
+        # Column references rather than a copy, so memory-mapped columns stay shared
+        self.features = pd.DataFrame({col: self.dataset[col] for col in self.dataset.columns if col != target_column},
+                                     copy=False)
+        if previous is not None:
+            # Appended rows are split on their own, so every earlier row keeps its side of the split. The column
+            # layout stays fixed for the models being continued.
+            train_test_split = lazy_import('sklearn.model_selection').train_test_split
+            added_train, added_test = train_test_split(self.features.index.to_numpy()[len(previous.features):],
+                                                       test_size=test_size, random_state=42)
+            self.train_index = np.concatenate([previous.train_index, added_train])
+            self.test_index = np.concatenate([previous.test_index, added_test])
+            self.preprocessor = Preprocessor(previous.preprocessor.state())
+        elif fit_scaler:
+            train_test_split = lazy_import('sklearn.model_selection').train_test_split
+            self.train_index, self.test_index = train_test_split(self.features.index.to_numpy(), test_size=test_size,
+                                                                 random_state=42)
+            self.preprocessor = Preprocessor().fit_encoding(self.features)
+        train_positions = self.features.index.get_indexer(self.train_index)
+        test_positions = self.features.index.get_indexer(self.test_index)
+        self.original_columns = self.preprocessor.columns
+        self.dummy_columns = self.preprocessor.encoded_columns
+        self.y_train, self.y_test = self.target.iloc[train_positions], self.target.iloc[test_positions]
+        X_test = self.preprocessor.encode(self.features.iloc[test_positions])
+        if previous is not None:
+            # Running statistics and value sets: only the appended rows are encoded for them. The full training
+            # matrix is built only if a model has to be refit.
+            X_added = self.preprocessor.encode(self.features.iloc[train_positions[len(previous.train_index):]])
+            self.preprocessor.update_scaling(X_added)
+            self.feature_values = distinct_values(np.vstack([X_added, X_test[len(previous.test_index):]]),
+                                                  previous.feature_values)
+            self.X_added_scaled = self.preprocessor.scale(X_added)
+            self.X_train_scaled = None
+        elif fit_scaler:
+            # Training statistics come from the training rows only
+            X_train = self.preprocessor.encode(self.features.iloc[train_positions])
+            self.preprocessor.fit_scaling(X_train)
+            # Kept with the artifact, so later generations can move tree splits without rereading the dataset
+            self.feature_values = distinct_values(np.vstack([X_train, X_test]))
+            self.X_train_scaled = self.preprocessor.scale(X_train)
+        else:
+            # A loaded model only needs the held-out rows, for evaluation plots
+            self.X_train_scaled = None
+        self.X_test_scaled = self.preprocessor.scale(X_test)
         return True
 
+    def ensure_training_matrix(self):
+        # An incremental update leaves the scaled training matrix unbuilt until a refit or cross-validation needs it
+        if self.X_train_scaled is None:
+            self.X_train_scaled = self.preprocessor.transform(
+                self.features.iloc[self.features.index.get_indexer(self.train_index)])
+        return self.X_train_scaled
+
     def train_models(self):
         if not hasattr(self, 'X_train_scaled') or self.X_train_scaled is None:
             return False
-        models = {
-            "Logistic Regression": LogisticRegression(max_iter=1000, random_state=42),
-            "Random Forest": RandomForestClassifier(random_state=42),
-            "XGBoost": XGBClassifier(random_state=42, eval_metric='logloss')
-        }
+        params = {name: dict(model_params) for name, model_params in MODEL_PARAMS.items()}
+        search = self.search_hyperparameters() if MODEL_SEARCH else None
+        if search is not None:
+            for name, result in search['models'].items():
+                params[name].update(result['params'])
+        models = {name: getattr(lazy_import(MODEL_CLASSES[name][0]), MODEL_CLASSES[name][1])(**model_params)
+                  for name, model_params in params.items()}
+        # Run candidates concurrently and split the cores between them so estimators don't oversubscribe
+        cores = os.cpu_count() or 1
+        workers = max(1, min(len(models), TRAINING_WORKERS or cores))
+        threads_per_model = max(1, cores // workers)
+        for name in MULTITHREADED_MODELS & models.keys():
+            models[name].set_params(n_jobs=threads_per_model)
         self.model_accuracies = {}
-        for name, model in models.items():
+        self.evaluation = {}
+        fit_times = {}
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {name: executor.submit(self.fit_candidate, model) for name, model in models.items()}
+            for name, future in futures.items():
+                try:
+                    model, report, fit_times[name] = future.result()
+                    if name in MULTITHREADED_MODELS:
+                        # Serving keeps the configured threading rather than the training budget
+                        model.set_params(n_jobs=MODEL_PARAMS[name].get('n_jobs'))
+                    self.models[name] = model
+                    self.evaluation[name] = report
+                    self.model_accuracies[name] = {"test_accuracy": report['accuracy'] * 100}
+                except Exception:
+                    self.model_accuracies[name] = {"test_accuracy": 0.0}
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+        self.training_report = {
+            "cores": cores,
+            "workers": workers,
+            "threads_per_model": threads_per_model,
+            "wall_time": wall_time,
+            "cpu_time": cpu_time,
+            "core_utilisation": cpu_time / (wall_time * cores) if wall_time > 0 else 0.0,
+            "fit_times": fit_times,
+            "search": search
+        }
+        app.logger.info("Trained %d models in %.2fs wall / %.2fs CPU on %d cores", len(fit_times), wall_time,
+                        cpu_time, cores)
+        if not self.model_accuracies:
+            return False
+        self.best_model_name = max(self.model_accuracies, key=lambda x: self.model_accuracies[x]["test_accuracy"])
+        self.best_model = self.models[self.best_model_name]
+        self.linear_state = None
+        if 'Logistic Regression' in self.models:
+            self.linear_state = fit_linear_summary(self.models['Logistic Regression'], self.X_train_scaled,
+                                                   self.y_train, self.preprocessor)
+        self.out_of_fold = {}
+        if ENSEMBLE_METHOD == 'stacking':
+            self.ensemble_weights = self.fit_stacking()
+        self.training_report['ensemble'] = self.evaluate_ensemble()
+        self.training_report['calibration'] = self.calibrate()
+        return True
+
+    def out_of_fold_probabilities(self, names):
+        # Positive-class probabilities for every training row from a model that never saw it; computed once per
+        # model and shared by stacking and calibration
+        model_selection = lazy_import('sklearn.model_selection')
+        clone = lazy_import('sklearn.base').clone
+        folds = model_selection.StratifiedKFold(n_splits=HOLDOUT_FOLDS, shuffle=True, random_state=42)
+        for name in names:
+            if name not in self.out_of_fold:
+                self.out_of_fold[name] = model_selection.cross_val_predict(
+                    clone(self.models[name]), self.ensure_training_matrix(), self.y_train, cv=folds,
+                    method='predict_proba')[:, 1]
+        return {name: self.out_of_fold[name] for name in names}
+
+    def served_probability(self, probabilities):
+        # The score serving produces from per-model probabilities: the ensemble's combination or the best model's
+        if not ENSEMBLE_METHOD:
+            return probabilities[self.best_model_name]
+        return Ensemble({name: self.models[name] for name in probabilities}, self.best_model_name,
+                        method=ENSEMBLE_METHOD, weights=self.ensemble_weights).combine(probabilities)
+
+    def fit_stacking(self):
+        # Meta-model over out-of-fold probabilities on the training split, so it learns how far to trust each model
+        try:
+            names = [name for name in self.models if name in self.evaluation]
+            probabilities = self.out_of_fold_probabilities(names)
+            out_of_fold = np.column_stack([probabilities[name] for name in names])
+            meta_model = lazy_import('sklearn.linear_model').LogisticRegression(random_state=42)
+            meta_model.fit(out_of_fold, self.y_train)
+        except Exception:
+            app.logger.exception("Fitting the stacking weights failed; the ensemble will use soft voting")
+            return None
+        return {'names': names, 'coef': meta_model.coef_[0].astype(np.float64),
+                'intercept': float(meta_model.intercept_[0])}
+
+    def evaluate_ensemble(self):
+        # Held-out accuracy of the combination, from the test probabilities each model was evaluated with
+        if not ENSEMBLE_METHOD:
+            return None
+        probabilities = {name: report['y_prob'] for name, report in self.evaluation.items() if name in self.models}
+        if any(probability is None for probability in probabilities.values()):
+            return None
+        ensemble = Ensemble({name: self.models[name] for name in probabilities}, self.best_model_name,
+                            method=ENSEMBLE_METHOD, weights=self.ensemble_weights)
+        probability = ensemble.combine(probabilities)
+        return {
+            "method": ensemble.method,
+            "weights": dict(zip(ensemble.weights['names'], ensemble.weights['coef'].tolist()))
+            if ensemble.weights is not None else None,
+            "test_accuracy": float(np.mean((probability >= 0.5) == np.asarray(self.y_test))) * 100
+        }
+
+    def calibrate(self, calibrator=None):
+        # Fits the calibrator on out-of-fold probabilities of the served score, unless one is carried over, then
+        # builds the operating-point table from the calibrated test probabilities
+        test = {name: report['y_prob'] for name, report in self.evaluation.items() if name in self.models}
+        if any(probability is None for probability in test.values()):
+            return None
+        self.calibrator = calibrator
+        if CALIBRATION and calibrator is None:
             try:
-                model.fit(self.X_train_scaled, self.y_train)
-                self.models[name] = model
-                y_pred = model.predict(self.X_test_scaled)
-                test_accuracy = accuracy_score(self.y_test, y_pred)
-                self.model_accuracies[name] = {"test_accuracy": float(test_accuracy * 100)}
+                names = list(test) if ENSEMBLE_METHOD else [self.best_model_name]
+                out_of_fold = self.served_probability(self.out_of_fold_probabilities(names))
+                self.calibrator = Calibrator.fit(CALIBRATION, out_of_fold, np.asarray(self.y_train))
             except Exception:
-                self.model_accuracies[name] = {"test_accuracy": 0.0}
-        if not self.model_accuracies:
+                app.logger.exception("Calibration failed; serving uncalibrated probabilities")
+        raw = self.served_probability(test)
+        probability = self.calibrator.apply(raw) if self.calibrator is not None else raw
+        y_true = np.asarray(self.y_test)
+        self.operating_points = operating_points(y_true, probability)
+        return {
+            "method": self.calibrator.method if self.calibrator is not None else None,
+            "brier_uncalibrated": float(np.mean(np.square(raw - y_true))),
+            "brier": float(np.mean(np.square(probability - y_true))),
+            "youden": self.operating_points['youden']
+        }
+
+    def update_models(self, previous):
+        # Continues the previous generation's models on the rows appended since it was trained. Returns False
+        # when a full retrain is needed instead: edited or removed rows, a large or single-class delta.
+        if previous is None or previous.preprocessor is None or previous.feature_values is None:
+            return False
+        if set(previous.models) != set(MODEL_PARAMS) or not self.dataset_appended:
+            return False
+        if list(previous.dataset.columns) != list(self.dataset.columns) or len(self.dataset) <= len(previous.dataset):
+            return False
+        previous_rows = len(previous.train_index)
+        try:
+            if not self.preprocess_data(previous=previous):
+                return False
+        except ValueError:
+            return False
+        y_added = np.asarray(self.y_train)[previous_rows:]
+        if len(np.unique(y_added)) < 2 or len(y_added) > INCREMENTAL_MAX_FRACTION * previous_rows:
             return False
+        wall_start = time.perf_counter()
+        self.linear_state = previous.linear_state
+        self.model_accuracies = {}
+        self.evaluation = {}
+        fit_times = {}
+        updates = {}
+        for name in MODEL_PARAMS:
+            try:
+                model, updates[name], fit_times[name] = self.extend_candidate(name, previous, previous_rows)
+            except Exception:
+                app.logger.exception("Incremental update of %s failed", name)
+                return False
+            self.models[name] = model
+            self.evaluation[name] = report = evaluate_model(model, self.X_test_scaled, self.y_test)
+            self.model_accuracies[name] = {"test_accuracy": report['accuracy'] * 100}
+        wall_time = time.perf_counter() - wall_start
+        self.training_report = {
+            "wall_time": wall_time,
+            "fit_times": fit_times,
+            "search": previous.training_report.get('search'),
+            "incremental": {
+                "base_version": previous.model_version,
+                "rows_added": len(self.features) - len(previous.features),
+                "train_rows_added": len(y_added),
+                "updates": updates
+            }
+        }
+        app.logger.info("Updated %d models on %d appended rows in %.2fs", len(fit_times),
+                        self.training_report['incremental']['rows_added'], wall_time)
         self.best_model_name = max(self.model_accuracies, key=lambda x: self.model_accuracies[x]["test_accuracy"])
         self.best_model = self.models[self.best_model_name]
+        # Stacking weights are kept from the full retrain; refitting them would mean cross-validating every model
+        self.ensemble_weights = previous.ensemble_weights
+        self.training_report['ensemble'] = self.evaluate_ensemble()
+        # Same for the calibrator; the operating points are rebuilt from the grown test split
+        self.training_report['calibration'] = self.calibrate(previous.calibrator)
         return True
 
-    def predict(self, patient_data, threshold=0.5):
+    def extend_candidate(self, name, previous, previous_rows):
+        # The copy is first moved onto the updated scaling and checked against the previous generation's test
+        # probabilities; a model that no longer agrees is refit from scratch with the same parameters
+        start = time.perf_counter()
+        model = rebase_model(copy.deepcopy(previous.models[name]), previous.preprocessor, self.preprocessor,
+                             self.feature_values)
+        expected = previous.evaluation[name]['y_prob']
+        if expected is None or np.max(np.abs(model.predict_proba(self.X_test_scaled[:len(expected)])[:, 1]
+                                              - expected)) > INCREMENTAL_TOLERANCE:
+            return self.refit_candidate(model, start)
+        X_added, y_added = self.X_added_scaled, np.asarray(self.y_train)[previous_rows:]
+        share = len(y_added) / previous_rows
+        model_type = type(model).__name__
+        if model_type == 'LogisticRegression':
+            # The earlier rows enter through the stored curvature of their loss, so only the appended rows are read
+            state = update_linear(model, previous.linear_state, self.preprocessor, X_added, y_added) \
+                if previous.linear_state is not None else None
+            if state is None:
+                return self.refit_candidate(model, start)
+            self.linear_state = state
+            update = 'newton'
+        elif model_type == 'RandomForestClassifier':
+            # New trees are grown on the appended rows, in proportion to their share of the training data
+            trees = len(model.estimators_)
+            model.set_params(warm_start=True, n_estimators=trees + math.ceil(trees * share))
+            model.fit(X_added, y_added)
+            model.set_params(warm_start=False)
+            update = 'added_trees'
+        else:
+            # Extra boosting rounds fitted to the appended rows, in proportion to their share
+            booster = model.get_booster()
+            rounds = booster.num_boosted_rounds()
+            model.set_params(n_estimators=math.ceil(rounds * share))
+            model.fit(X_added, y_added, xgb_model=booster)
+            model.set_params(n_estimators=model.get_booster().num_boosted_rounds())
+            update = 'added_rounds'
+        return model, update, time.perf_counter() - start
+
+    def refit_candidate(self, model, start):
+        model = lazy_import('sklearn.base').clone(model)
+        model.fit(self.ensure_training_matrix(), self.y_train)
+        if type(model).__name__ == 'LogisticRegression':
+            self.linear_state = fit_linear_summary(model, self.X_train_scaled, self.y_train, self.preprocessor)
+        return model, 'refit', time.perf_counter() - start
+
+    def search_hyperparameters(self):
+        # Cross-validated on the training split only; the test split still decides between the tuned models
+        try:
+            search = lazy_import('model_search').search(
+                self.X_train_scaled, self.y_train, MODEL_CLASSES, MODEL_PARAMS,
+                {name: grid for name, grid in SEARCH_SPACE.items() if name in MODEL_PARAMS},
+                n_folds=SEARCH_FOLDS, factor=SEARCH_HALVING_FACTOR, workers=SEARCH_WORKERS,
+                budget_seconds=SEARCH_BUDGET_SECONDS, cache_dir=SEARCH_DIR,
+                fixed_params={name: {"n_jobs": 1} for name in MULTITHREADED_MODELS})
+        except Exception:
+            app.logger.exception("Hyperparameter search failed; training with the default parameters")
+            return None
+        app.logger.info("Hyperparameter search: %d fits run, %d cached, %.1fs CPU in %.1fs", search['tasks_run'],
+                        search['tasks_cached'], search['cpu_seconds'], search['wall_seconds'])
+        return search
+
+    def fit_candidate(self, model):
+        start = time.perf_counter()
+        model.fit(self.X_train_scaled, self.y_train)
+        fit_time = time.perf_counter() - start
+        return model, evaluate_model(model, self.X_test_scaled, self.y_test), fit_time
+
+    def export_native(self, rows=None):
+        # Exports the best model, and when the ensemble serves natively every other model too, checking each
+        # against its estimator on a sample of the given dataset rows, scaled and raw
+        self.native_model = None
+        self.native_error = None
+        self.native_members = {}
+        if not (NATIVE_INFERENCE or EXPLANATIONS):
+            return False
+        positions = np.arange(len(self.features))[slice(None) if rows is None else rows]
+        if len(positions) > NATIVE_VERIFY_ROWS:
+            positions = np.sort(np.random.default_rng(42).choice(positions, NATIVE_VERIFY_ROWS, replace=False))
+        X_raw = self.preprocessor.encode(self.features.iloc[positions])
+        X_scaled = self.preprocessor.scale(X_raw.copy())
+        if NATIVE_INFERENCE and ENSEMBLE_METHOD:
+            for name in self.evaluation:
+                if name != self.best_model_name and name in self.models:
+                    native, error = self.verified_export(name, self.models[name], X_raw, X_scaled)
+                    if native is not None:
+                        self.native_members[name] = (native, error)
+        self.native_model, self.native_error = self.verified_export(self.best_model_name, self.best_model, X_raw,
+                                                                    X_scaled)
+        return self.native_model is not None
+
+    def verified_export(self, name, model, X_raw, X_scaled):
+        try:
+            native = NativeModel.export(model, self.preprocessor.mean, self.preprocessor.std)
+            expected = model.predict_proba(X_scaled)[:, 1]
+            error = max(float(np.max(np.abs(native.predict_proba(X_scaled)[:, 1] - expected))),
+                        float(np.max(np.abs(native.score_raw(X_raw) - expected))))
+        except Exception as e:
+            app.logger.warning("Native export of %s failed: %s", name, e)
+            return None, None
+        if error > NATIVE_TOLERANCE:
+            app.logger.warning("Native export of %s disagrees by %.3g, keeping the estimator", name, error)
+            return None, None
+        return native, error
+
+    def hash_dataset(self, previous=None):
+        base = (previous.dataset_size, previous.dataset_digest) if previous is not None and previous.dataset_digest \
+            else None
+        try:
+            self.dataset_size, self.dataset_digest, self.dataset_appended = hash_dataset(DATASET_PATH, base)
+        except OSError:
+            self.dataset_size, self.dataset_digest, self.dataset_appended = None, None, False
+
+    def artifact_key(self, test_size=0.2, lineage=None):
+        # Hash of the dataset contents, hyperparameters and library versions, and the base version of an
+        # incremental update
+        if self.dataset_digest is None:
+            return None
+        digest = hashlib.sha256()
+        digest.update(f"format={ARTIFACT_FORMAT};test_size={test_size};".encode())
+        digest.update(f"sklearn={metadata.version('scikit-learn')};xgboost={metadata.version('xgboost')};".encode())
+        digest.update(repr(sorted((name, sorted(params.items())) for name, params in MODEL_PARAMS.items())).encode())
+        if ENSEMBLE_METHOD == 'stacking':
+            digest.update(f"stacking={HOLDOUT_FOLDS};".encode())
+        if CALIBRATION:
+            digest.update(f"calibration={CALIBRATION};folds={HOLDOUT_FOLDS};".encode())
+        if MODEL_SEARCH:
+            digest.update(repr((sorted((name, sorted(grid.items())) for name, grid in SEARCH_SPACE.items()),
+                                SEARCH_FOLDS, SEARCH_HALVING_FACTOR, SEARCH_BUDGET_SECONDS)).encode())
+        if lineage is not None:
+            digest.update(f"lineage={lineage['base']};".encode())
+        digest.update(self.dataset_digest.encode())
+        return digest.hexdigest()[:16]
+
+    def load_artifacts(self, lineage=None):
+        if self.model_version is None:
+            return False
+        artifact_path = os.path.join(ARTIFACT_DIR, self.model_version)
+        try:
+            meta = joblib.load(os.path.join(artifact_path, 'meta.joblib'))
+            if meta.get('format') != ARTIFACT_FORMAT or meta.get('lineage') != lineage:
+                return False
+            models = ArtifactModels(artifact_path, meta['model_files'])
+            native = meta.get('native')
+            if native and (NATIVE_INFERENCE or EXPLANATIONS):
+                # Loaded even when the estimator serves, since explanations come from the export
+                self.native_model = NativeModel.load(os.path.join(artifact_path, native['file']))
+                self.native_error = native['max_error']
+            if NATIVE_INFERENCE and native:
+                best_model = self.native_model
+            else:
+                best_model = models[meta['best_model_name']]
+            if NATIVE_INFERENCE and ENSEMBLE_METHOD:
+                self.native_members = {
+                    name: (NativeModel.load(os.path.join(artifact_path, member['file'])), member['max_error'])
+                    for name, member in meta.get('native_members', {}).items()
+                }
+        except Exception:
+            return False
+        self.preprocessor = Preprocessor(meta['preprocessor'])
+        self.train_index = meta['train_index']
+        self.test_index = meta['test_index']
+        self.original_columns = self.preprocessor.columns
+        self.dummy_columns = self.preprocessor.encoded_columns
+        self.model_accuracies = meta['model_accuracies']
+        self.evaluation = meta['evaluation']
+        self.training_report = meta.get('training_report', {})
+        self.ensemble_weights = meta.get('ensemble_weights')
+        self.calibrator = Calibrator(meta['calibrator']) if meta.get('calibrator') else None
+        self.operating_points = meta.get('operating_points')
+        self.feature_values = meta.get('feature_values')
+        self.linear_state = meta.get('linear_state')
+        self.lineage = lineage
+        self.models = models
+        self.best_model_name = meta['best_model_name']
+        self.best_model = best_model
+        return True
+
+    def save_artifacts(self):
+        if self.model_version is None or self.best_model is None:
+            return False
+        artifact_path = os.path.join(ARTIFACT_DIR, self.model_version)
+        if os.path.isdir(artifact_path):
+            return True
+        # Write into a private directory first so other workers never see a partial store
+        tmp_path = os.path.join(ARTIFACT_DIR, f".tmp-{self.model_version}-{os.getpid()}")
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            model_files = {}
+            for name, model in self.models.items():
+                filename = name.lower().replace(' ', '_') + '.joblib'
+                joblib.dump(model, os.path.join(tmp_path, filename))
+                model_files[name] = filename
+            native = None
+            if self.native_model is not None:
+                self.native_model.save(os.path.join(tmp_path, 'native.npz'))
+                native = {'file': 'native.npz', 'kind': self.native_model.kind, 'max_error': self.native_error}
+            native_members = {}
+            for name, (member, error) in self.native_members.items():
+                filename = 'native_' + name.lower().replace(' ', '_') + '.npz'
+                member.save(os.path.join(tmp_path, filename))
+                native_members[name] = {'file': filename, 'kind': member.kind, 'max_error': error}
+            # Only plain arrays and builtins in meta, so loading it imports neither sklearn nor xgboost
+            meta = {
+                'format': ARTIFACT_FORMAT,
+                'preprocessor': self.preprocessor.state(),
+                'train_index': self.train_index,
+                'test_index': self.test_index,
+                'native': native,
+                'native_members': native_members,
+                'ensemble_weights': self.ensemble_weights,
+                'calibrator': self.calibrator.state() if self.calibrator is not None else None,
+                'operating_points': self.operating_points,
+                'feature_values': self.feature_values,
+                'linear_state': self.linear_state,
+                'lineage': self.lineage,
+                'model_accuracies': self.model_accuracies,
+                'evaluation': self.evaluation,
+                'training_report': self.training_report,
+                'best_model_name': self.best_model_name,
+                'model_files': model_files
+            }
+            joblib.dump(meta, os.path.join(tmp_path, 'meta.joblib'))
+            os.rename(tmp_path, artifact_path)
+            return True
+        except OSError:
+            # Another worker published the same version first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return os.path.isdir(artifact_path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+
+    def patient_key(self, patient_data):
+        # Canonical feature vector for fully numeric inputs, so 63 and 63.0 share a cache entry
+        if self.prediction_cache.max_size <= 0:
+            return None
+        key = []
+        for col in self.original_columns:
+            value = patient_data.get(col)
+            if not isinstance(value, NUMERIC_TYPES):
+                return None
+            key.append(float(value))
+        return tuple(key)
+
+    def explain(self, X_scaled):
+        # Contributions of the best model's export per source column, one-hot levels summed into their field
+        if self.native_model is None:
+            return None, None
+        base, contributions = self.native_model.contributions(X_scaled)
+        return base, contributions @ self.preprocessor.sources
+
+    def explained_probability(self, base, contributions):
+        # What base plus contributions add up to: the best model's own probability, before calibration and ensembling
+        output = base + contributions.sum(axis=-1)
+        return output if self.native_model.output_scale == 'probability' else 1.0 / (1.0 + np.exp(-output))
+
+    def predict(self, patient_data, threshold=None, explain=False):
         if self.best_model is None:
             return None
+        if threshold is None:
+            threshold = self.default_threshold
+        start = time.perf_counter()
         try:
-            input_df = pd.DataFrame([patient_data], columns=self.original_columns)
-            categorical_cols = input_df.select_dtypes(include=['object', 'category']).columns
-            if len(categorical_cols) > 0:
-                input_df = pd.get_dummies(input_df, columns=categorical_cols)
-            for col in self.dummy_columns:
-                if col not in input_df.columns:
-                    input_df[col] = 0
-            input_df = input_df[self.dummy_columns]
-            scaled_data = self.scaler.transform(input_df)
-            probabilities = self.best_model.predict_proba(scaled_data)[0]
-            probability = probabilities[1]
+            model = self.ensemble if self.ensemble is not None else self.best_model
+            key = self.patient_key(patient_data)
+            cached = None
+            if key is not None:
+                cached = self.prediction_cache.get(model, key)
+            skipped = []
+            scaled_data = None
+            if cached is None:
+                scaled_data = self.preprocessor.transform_row(patient_data)
+                scaled_at = time.perf_counter()
+                STAGE_LATENCY.observe(('scaler_transform',), scaled_at - start)
+                model_probabilities = None
+                if self.ensemble is not None:
+                    combined, scores, skipped = self.ensemble.score(scaled_data, ENSEMBLE_BUDGET_MS / 1000.0)
+                    probability = combined[0]
+                    model_probabilities = {name: float(values[0]) for name, values in scores.items()}
+                elif micro_batcher is not None:
+                    probability = micro_batcher.predict_proba(model, scaled_data)[1]
+                else:
+                    probability = model.predict_proba(scaled_data)[0][1]
+                if self.calibrator is not None:
+                    probability = self.calibrator.apply(probability)
+                STAGE_LATENCY.observe(('predict_proba',), time.perf_counter() - scaled_at)
+                # A vote that skipped a model is not cached, so the next request can include it
+                if key is not None and not skipped:
+                    self.prediction_cache.put(model, key, (probability, model_probabilities, None))
+            else:
+                probability, model_probabilities, contributions = cached
             prediction = 1 if probability >= threshold else 0
-            return {
+            result = {
                 "probability": probability,
                 "prediction": prediction
             }
+            if model_probabilities is not None:
+                votes = [name for name, value in model_probabilities.items() if (value >= threshold) == prediction]
+                result.update(models=model_probabilities, agreement=len(votes) / len(model_probabilities),
+                              skipped=skipped, ensemble=self.ensemble.method)
+            if explain and self.native_model is not None:
+                # Computed on first request and stored with the cached probability
+                if cached is None or cached[2] is None:
+                    if scaled_data is None:
+                        scaled_data = self.preprocessor.transform_row(patient_data)
+                    contributions = self.explain(scaled_data)
+                    if key is not None and not skipped:
+                        self.prediction_cache.put(model, key, (probability, model_probabilities, contributions))
+                base, values = contributions
+                result['explanation'] = {
+                    "model": self.best_model_name,
+                    "scale": self.native_model.output_scale,
+                    "base": base,
+                    "model_probability": float(self.explained_probability(base, values[0])),
+                    "contributions": dict(zip(self.original_columns, values[0].tolist()))
+                }
+            return result
+        except Exception:
+            ERRORS.inc(('predict',))
+            return None
+        finally:
+            STAGE_LATENCY.observe(('predict',), time.perf_counter() - start)
+
+    def iter_scored_csv(self, source, threshold=None, chunk_size=BATCH_CHUNK_SIZE, explain=False):
+        # Reads a patient CSV chunk by chunk and yields scored CSV text, so memory stays flat
+        reader = pd.read_csv(source, dtype=CSV_DTYPES, skipinitialspace=True, chunksize=chunk_size)
+        header = True
+        for chunk in reader:
+            clean_frame, rows, errors = validate_frame(chunk, self.original_columns)
+            out = pd.DataFrame({
+                'row': chunk.index,
+                'probability': np.full(len(chunk), np.nan),
+                'prediction': pd.array([None] * len(chunk), dtype='Int8'),
+                'error': ''
+            })
+            # Ensemble serving adds the agreement and one probability column per model before the error column
+            extra = []
+            if self.ensemble is not None:
+                extra = ['agreement'] + [f"probability_{name.lower().replace(' ', '_')}" for name in self.ensemble.models]
+                for col in extra:
+                    out.insert(len(out.columns) - 1, col, np.nan)
+            explained = []
+            if explain and self.native_model is not None:
+                explained = [f"contribution_{col.lower()}" for col in self.original_columns]
+                for col in explained:
+                    out.insert(len(out.columns) - 1, col, np.nan)
+            if len(clean_frame) > 0:
+                scored = self.predict_batch(clean_frame, threshold=threshold, chunk_size=chunk_size,
+                                            explain=bool(explained))
+                if scored is None:
+                    out.loc[rows, 'error'] = 'Prediction failed.'
+                else:
+                    out.loc[rows, 'probability'] = scored['probability']
+                    out.loc[rows, 'prediction'] = scored['prediction']
+                    if extra:
+                        out.loc[rows, 'agreement'] = scored['agreement']
+                        for col, values in zip(extra[1:], scored['models'].values()):
+                            out.loc[rows, col] = values
+                    if explained:
+                        out.loc[rows, explained] = scored['explanation']['contributions']
+            for error in errors:
+                out.at[error['row'], 'error'] = error['error']
+            yield out.to_csv(index=False, header=header)
+            header = False
+
+    def dataset_arrays(self):
+        # Column arrays and per-column sort orders are built once per dataset and reused by every page
+        if self.column_arrays is None:
+            self.column_arrays = {col: self.dataset[col].to_numpy() for col in self.dataset.columns}
+        return self.column_arrays
+
+    def sort_order(self, column):
+        order = self.sort_orders.get(column)
+        if order is None:
+            order = np.argsort(self.dataset_arrays()[column], kind='stable')
+            self.sort_orders[column] = order
+        return order
+
+    def dataset_page(self, offset=0, limit=DATASET_PAGE_SIZE, sort=None, filters=()):
+        arrays = self.dataset_arrays()
+        mask = None
+        for column, operator, value in filters:
+            if column not in arrays:
+                raise ValueError(f"Unknown column '{column}' in filter.")
+            values = arrays[column]
+            if values.dtype.kind in 'biuf':
+                try:
+                    value = float(value)
+                except ValueError:
+                    raise ValueError(f"Filter value for {column} must be a number.")
+            condition = FILTER_OPERATORS[operator](values, value)
+            mask = condition if mask is None else mask & condition
+        if sort:
+            column = sort.lstrip('-')
+            if column not in arrays:
+                raise ValueError(f"Unknown sort column '{column}'.")
+            order = self.sort_order(column)
+            if sort.startswith('-'):
+                order = order[::-1]
+            if mask is not None:
+                order = order[mask[order]]
+            total = len(order)
+            positions = order[offset:offset + limit]
+        elif mask is not None:
+            matches = np.flatnonzero(mask)
+            total = len(matches)
+            positions = matches[offset:offset + limit]
+        else:
+            total = len(self.dataset)
+            positions = np.arange(offset, min(offset + limit, total))
+        return {
+            "columns": list(arrays),
+            "rows": list(zip(*(page_values(values[positions]) for values in arrays.values()))),
+            "total": total,
+            "offset": offset,
+            "limit": limit
+        }
+
+    def predict_batch(self, frame, threshold=None, chunk_size=BATCH_CHUNK_SIZE, explain=False):
+        if self.best_model is None or self.preprocessor is None:
+            return None
+        if threshold is None:
+            threshold = self.default_threshold
+        try:
+            matrix = self.preprocessor.encode(frame)
+            contributions = base = None
+            if explain and self.native_model is not None:
+                # Before scoring, which may scale matrix chunks in place
+                contributions = np.empty((len(matrix), len(self.original_columns)), dtype=np.float64)
+                for start in range(0, len(matrix), chunk_size):
+                    chunk_start = time.perf_counter()
+                    block = self.preprocessor.scale(matrix[start:start + chunk_size].copy())
+                    base, contributions[start:start + chunk_size] = self.explain(block)
+                    STAGE_LATENCY.observe(('batch_explain',), time.perf_counter() - chunk_start)
+            probabilities = np.empty(len(matrix), dtype=np.float64)
+            ensemble = self.ensemble
+            model_probabilities = None
+            if ensemble is not None:
+                # Batches are throughput-bound, so every model scores every chunk regardless of the budget
+                model_probabilities = {name: np.empty(len(matrix), dtype=np.float64) for name in ensemble.models}
+                for start in range(0, len(matrix), chunk_size):
+                    block = self.preprocessor.scale(np.ascontiguousarray(matrix[start:start + chunk_size]))
+                    chunk_start = time.perf_counter()
+                    probabilities[start:start + chunk_size], scores, _ = ensemble.score(block)
+                    for name, values in scores.items():
+                        model_probabilities[name][start:start + chunk_size] = values
+                    STAGE_LATENCY.observe(('batch_predict_proba',), time.perf_counter() - chunk_start)
+            else:
+                native = isinstance(self.best_model, NativeModel)
+                for start in range(0, len(matrix), chunk_size):
+                    block = np.ascontiguousarray(matrix[start:start + chunk_size])
+                    chunk_start = time.perf_counter()
+                    if native:
+                        probabilities[start:start + chunk_size] = self.best_model.score_raw(block)
+                        STAGE_LATENCY.observe(('batch_predict_proba',), time.perf_counter() - chunk_start)
+                        continue
+                    self.preprocessor.scale(block)
+                    scaled_at = time.perf_counter()
+                    STAGE_LATENCY.observe(('batch_scaler_transform',), scaled_at - chunk_start)
+                    probabilities[start:start + chunk_size] = self.best_model.predict_proba(block)[:, 1]
+                    STAGE_LATENCY.observe(('batch_predict_proba',), time.perf_counter() - scaled_at)
+            if self.calibrator is not None:
+                probabilities = self.calibrator.apply(probabilities)
+            prediction = (probabilities >= threshold).astype(np.int8)
+            result = {
+                "probability": probabilities,
+                "prediction": prediction
+            }
+            if model_probabilities is not None:
+                result.update(models=model_probabilities,
+                              agreement=ensemble.agreement(model_probabilities, prediction, threshold))
+            if contributions is not None:
+                result['explanation'] = {
+                    "model": self.best_model_name,
+                    "scale": self.native_model.output_scale,
+                    "base": base,
+                    "model_probability": self.explained_probability(base, contributions),
+                    "contributions": contributions
+                }
+            return result
         except Exception:
+            ERRORS.inc(('predict_batch',))
             return None
 
-# Initialize AI system
-ai_system = HealthcareAI()
+# Background retraining: a new generation is built off the request path and swapped in by
+# rebinding ai_system. Routes read ai_system once, so in-flight requests finish on their generation.
+def dataset_signature():
+    try:
+        stat = os.stat(DATASET_PATH)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def reload_ai_system():
+    global ai_system
+    candidate = HealthcareAI(previous=ai_system)
+    if candidate.best_model is None or candidate.model_version == ai_system.model_version:
+        return False
+    app.logger.info("Swapping model %s -> %s", ai_system.model_version, candidate.model_version)
+    ai_system = candidate
+    return True
+
+class ModelReloader(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name='model-reloader', daemon=True)
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.last_signature = dataset_signature()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def check(self):
+        signature = dataset_signature()
+        if signature is None or signature == self.last_signature:
+            return False
+        try:
+            reloaded = reload_ai_system()
+        except Exception:
+            app.logger.exception("Background retraining failed; keeping model %s", ai_system.model_version)
+            return False
+        # Recorded only once the file was handled, so a failed retraining is retried on the next check
+        self.last_signature = signature
+        return reloaded
+
+    def stop(self):
+        self.stop_event.set()
+
+# Initialize AI system; skipped when this file is re-imported as the main module of a spawned search worker
+ai_system = HealthcareAI() if __name__ != '__mp_main__' else None
+STARTUP_SECONDS = time.perf_counter() - STARTUP_TIME
+if IMPORT_REPORT:
+    app.logger.warning("Startup took %.3fs; lazy imports: %s", STARTUP_SECONDS,
+                       ", ".join(f"{name}={seconds:.3f}s" for name, seconds in import_report()["modules"].items())
+                       or "none")
+model_reloader = None
+if RELOAD_INTERVAL > 0 and ai_system is not None:
+    model_reloader = ModelReloader(RELOAD_INTERVAL)
+    model_reloader.start()
 
 @app.route('/', methods=['GET', 'POST'])
 def predict():
+    ai = ai_system
     expected_features = ['Age', 'Sex', 'CP', 'Trestbps', 'Chol', 'Fbs', 'Restecg', 'Thalach', 'Exang', 'Oldpeak',
                          'Slope', 'CA', 'Thal']
     content = PREDICT_HTML
-    if ai_system.dataset is None:
+    last_modified = ai.loaded_at
+    if ai.dataset is None:
         flash('Dataset not loaded. Ensure heart.csv is in the correct directory.', 'error')
-    elif not hasattr(ai_system, 'features') or ai_system.features is None:
+    elif not hasattr(ai, 'features') or ai.features is None:
         flash('Model not trained. Check dataset and preprocessing.', 'error')
-    elif not all(f in ai_system.original_columns for f in expected_features):
+    elif not all(f in ai.original_columns for f in expected_features):
         flash('Dataset columns do not match expected features. Check heart.csv.', 'error')
     elif request.method == 'POST':
-        patient_data = {}
-        for field, value in request.form.items():
-            try:
-                if field in ai_system.original_columns:
-                    if field in CATEGORICAL_OPTIONS:
-                        if value not in CATEGORICAL_OPTIONS[field]:
-                            flash(f"Invalid value for {field}. Select a valid option.", 'error')
-                            break
-                        patient_data[field] = int(value)
-                    else:
-                        patient_data[field] = float(value)
-            except ValueError:
-                flash(f"Invalid value for {field}. Please enter a valid number.", 'error')
-                break
-        else:  # No break occurred, process prediction
-            result = ai_system.predict(patient_data)
+        last_modified = None
+        patient_data, error = validate_patient(request.form, ai.original_columns)
+        if error:
+            flash(error, 'error')
+        else:
+            result = ai.predict(patient_data, explain=True)
             if result:
                 prediction_text = 'Disease Detected' if result['prediction'] == 1 else 'No Disease Detected'
                 probability = round(result['probability'] * 100, 2)
                 prediction_class = 'danger' if result['prediction'] == 1 else 'success'
-                result_html = render_template_string(PREDICTION_RESULT_HTML, prediction_text=prediction_text,
-                                                     probability=probability, prediction_class=prediction_class)
-                content = PREDICT_HTML.replace(
-                    '<div id="prediction-result" style="margin-top: 20px;">\n    <h3 style="margin-bottom: 20px;">Prediction Result</h3>\n    <p>Submit the form to see the prediction result.</p>\n</div>',
-                    f'<div id="prediction-result" style="margin-top: 20px;">\n{result_html}\n</div>'
-                )
+                models = result.get('models')
+                agreeing = round(result['agreement'] * len(models)) if models else 0
+                explanation = result.get('explanation')
+                # The drivers explain the best model alone; its own score is named when calibration or voting moved it
+                explained = explanation if explanation and \
+                    abs(explanation['model_probability'] - result['probability']) > 1e-9 else None
+                result_html = render(PREDICTION_RESULT_TEMPLATE, prediction_text=prediction_text,
+                                     probability=probability, prediction_class=prediction_class, models=models,
+                                     agreeing=agreeing, drivers=top_contributions(explanation), explained=explained)
+                content = ''.join([PREDICT_HTML_HEAD, '<div id="prediction-result" style="margin-top: 20px;">\n',
+                                   result_html, '\n</div>', PREDICT_HTML_TAIL])
             else:
                 flash('Prediction failed. Ensure all required features are provided correctly.', 'error')
     try:
-        response = make_response(render_template_string(BASE_HTML, title="Predict Heart Disease", content=content))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        return page_response("Predict Heart Disease", content, last_modified)
     except Exception as e:
         flash(f"Error rendering page: {str(e)}", 'error')
-        response = make_response(render_template_string(BASE_HTML, title="Predict Heart Disease", content=PREDICT_HTML))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        return page_response("Predict Heart Disease", PREDICT_HTML)
+
+@app.route('/api/predict', methods=['POST'])
+def predict_api():
+    ai = ai_system
+    if ai.best_model is None:
+        return jsonify({"errors": ['Model not trained. Check dataset and preprocessing.']}), 503
+    values = request.get_json(silent=True) if request.is_json else request.form
+    if not isinstance(values, Mapping):
+        return jsonify({"errors": ['Expected a JSON object or form fields.']}), 400
+    values = {field: str(value) for field, value in values.items()}
+    try:
+        threshold, operating_point = request_threshold(ai, request.args)
+    except ValueError as e:
+        return jsonify({"errors": [str(e)]}), 400
+    patient_data, error = validate_patient(values, ai.original_columns)
+    if error is None:
+        missing = [field for field in ai.original_columns if field not in patient_data]
+        if missing:
+            error = f"Missing value for {', '.join(missing)}."
+    if error:
+        return jsonify({"errors": [error]}), 400
+    result = ai.predict(patient_data, threshold=threshold, explain=True)
+    if result is None:
+        return jsonify({"errors": ['Prediction failed. Ensure all required features are provided correctly.']}), 500
+    response = {
+        "probability": float(result['probability']),
+        "probability_percent": round(float(result['probability']) * 100, 2),
+        "prediction": result['prediction'],
+        "label": 'Disease Detected' if result['prediction'] == 1 else 'No Disease Detected',
+        "threshold": threshold,
+        "operating_point": operating_point,
+        "calibrated": ai.calibrator is not None,
+        "model_version": ai.model_version,
+        "errors": []
+    }
+    if 'models' in result:
+        response.update(ensemble=result['ensemble'], models=result['models'], agreement=result['agreement'],
+                        skipped=result['skipped'])
+    if 'explanation' in result:
+        response['explanation'] = result['explanation']
+    return jsonify(response)
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    ai = ai_system
+    if ai.best_model is None:
+        return jsonify({"error": "Model not trained. Check dataset and preprocessing."}), 503
+    try:
+        if request.is_json:
+            payload = request.get_json(silent=True)
+            rows = payload.get('patients') if isinstance(payload, dict) else payload
+            if not isinstance(rows, list):
+                return jsonify({"error": "Expected a list of patients or {\"patients\": [...]}."}), 400
+            frame = pd.DataFrame(rows, dtype=object).astype(str)
+        elif 'file' in request.files:
+            frame = pd.read_csv(request.files['file'].stream, dtype=CSV_DTYPES, skipinitialspace=True)
+        elif request.mimetype == 'text/csv':
+            frame = pd.read_csv(io.BytesIO(request.get_data()), dtype=CSV_DTYPES, skipinitialspace=True)
+        else:
+            return jsonify({"error": "Send JSON, a text/csv body or a multipart 'file' upload."}), 400
+        threshold, operating_point = request_threshold(ai, request.args)
+        explain = request.args.get('explain') == '1'
+    except (ValueError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        return jsonify({"error": f"Could not parse request: {str(e)}"}), 400
+    if len(frame) > BATCH_MAX_ROWS:
+        return jsonify({"error": f"Batch too large. At most {BATCH_MAX_ROWS} rows per request."}), 413
+
+    clean_frame, rows, errors = validate_frame(frame, ai.original_columns)
+    results = []
+    explanation = None
+    if len(clean_frame) > 0:
+        scored = ai.predict_batch(clean_frame, threshold=threshold, explain=explain)
+        if scored is None:
+            return jsonify({"error": "Prediction failed."}), 500
+        results = [
+            {"row": int(row), "probability": float(probability), "prediction": int(prediction),
+             "label": 'Disease Detected' if prediction == 1 else 'No Disease Detected'}
+            for row, probability, prediction in zip(rows, scored['probability'], scored['prediction'])
+        ]
+        if 'models' in scored:
+            names = list(scored['models'])
+            columns = zip(*(scored['models'][name].tolist() for name in names))
+            for result, values, agreement in zip(results, columns, scored['agreement'].tolist()):
+                result.update(models=dict(zip(names, values)), agreement=agreement)
+        if 'explanation' in scored:
+            explanation = {key: value for key, value in scored['explanation'].items()
+                           if key not in ('contributions', 'model_probability')}
+            for result, values, model_probability in zip(results, scored['explanation']['contributions'].tolist(),
+                                                         scored['explanation']['model_probability'].tolist()):
+                result.update(contributions=dict(zip(ai.original_columns, values)), model_probability=model_probability)
+    return jsonify({
+        "model": ai.best_model_name,
+        "ensemble": ai.ensemble.method if ai.ensemble is not None else None,
+        "model_version": ai.model_version,
+        "threshold": threshold,
+        "operating_point": operating_point,
+        "calibrated": ai.calibrator is not None,
+        "explanation": explanation,
+        "results": results,
+        "errors": errors
+    })
+
+@app.route('/api/predict/stream', methods=['POST'])
+def predict_stream():
+    ai = ai_system
+    if ai.best_model is None:
+        return jsonify({"error": "Model not trained. Check dataset and preprocessing."}), 503
+    try:
+        threshold, _ = request_threshold(ai, request.args)
+        chunk_size = int(request.args.get('chunk_size', BATCH_CHUNK_SIZE))
+        explain = request.args.get('explain') == '1'
+    except ValueError as e:
+        return jsonify({"error": f"Could not parse request: {str(e)}"}), 400
+    if chunk_size < 1:
+        return jsonify({"error": "chunk_size must be positive."}), 400
+
+    def generate():
+        # Resolve the upload inside the streamed context so it stays open while rows are scored
+        source = request.files['file'].stream if 'file' in request.files else request.stream
+        yield from ai.iter_scored_csv(source, threshold=threshold, chunk_size=chunk_size, explain=explain)
+
+    return Response(stream_with_context(generate()), mimetype='text/csv')
+
+@app.route('/api/model_metrics')
+def model_metrics():
+    ai = ai_system
+    if ai.best_model is None:
+        return jsonify({"error": "Model not trained. Check dataset and preprocessing."}), 503
+    return jsonify({
+        "best_model": ai.best_model_name,
+        "model_version": ai.model_version,
+        "models": {name: scalar_metrics(report) for name, report in ai.evaluation.items()},
+        "training": ai.training_report,
+        "prediction_cache": ai.prediction_cache.stats(),
+        "micro_batching": micro_batcher.stats() if micro_batcher is not None else None,
+        "ensemble": {
+            "method": ai.ensemble.method,
+            "models": list(ai.ensemble.models),
+            "budget_ms": ENSEMBLE_BUDGET_MS
+        } if ai.ensemble is not None else None,
+        "calibration": ai.calibrator.method if ai.calibrator is not None else None,
+        "default_operating_point": ai.default_operating_point,
+        "operating_points": ai.operating_points,
+        "native_inference": {
+            "enabled": isinstance(ai.best_model, NativeModel),
+            "kind": ai.native_model.kind if ai.native_model is not None else None,
+            "max_error": ai.native_error,
+            "ensemble_members": {name: error for name, (_, error) in ai.native_members.items()}
+        }
+    })
+
+@app.route('/metrics')
+def metrics():
+    ai = ai_system
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    cache = ai.prediction_cache.stats()
+    model_labels = format_labels(('model_version', 'best_model', 'native'),
+                                 (ai.model_version, ai.best_model_name, str(isinstance(ai.best_model, NativeModel)).lower()))
+    lines += [
+        '# HELP healthcare_ai_model_info Model generation currently serving requests.',
+        '# TYPE healthcare_ai_model_info gauge',
+        f'healthcare_ai_model_info{model_labels} 1',
+        '# HELP healthcare_ai_model_loaded_timestamp_seconds When the serving model generation was loaded.',
+        '# TYPE healthcare_ai_model_loaded_timestamp_seconds gauge',
+        f'healthcare_ai_model_loaded_timestamp_seconds {ai.loaded_at.timestamp()}',
+        '# HELP healthcare_ai_startup_seconds Time from process start to the first model generation.',
+        '# TYPE healthcare_ai_startup_seconds gauge',
+        f'healthcare_ai_startup_seconds {STARTUP_SECONDS}',
+        '# HELP healthcare_ai_prediction_cache_lookups_total Prediction cache lookups, per result.',
+        '# TYPE healthcare_ai_prediction_cache_lookups_total counter',
+        f'healthcare_ai_prediction_cache_lookups_total{{result="hit"}} {cache["hits"]}',
+        f'healthcare_ai_prediction_cache_lookups_total{{result="miss"}} {cache["misses"]}',
+        '# HELP healthcare_ai_prediction_cache_hit_ratio Share of prediction cache lookups that were hits.',
+        '# TYPE healthcare_ai_prediction_cache_hit_ratio gauge',
+        f'healthcare_ai_prediction_cache_hit_ratio {cache["hit_rate"]}',
+        '# HELP healthcare_ai_prediction_cache_entries Entries in the prediction cache.',
+        '# TYPE healthcare_ai_prediction_cache_entries gauge',
+        f'healthcare_ai_prediction_cache_entries {cache["size"]}'
+    ]
+    if micro_batcher is not None:
+        batching = micro_batcher.stats()
+        lines += [
+            '# HELP healthcare_ai_micro_batch_queue_depth Rows waiting for the micro-batcher.',
+            '# TYPE healthcare_ai_micro_batch_queue_depth gauge',
+            f'healthcare_ai_micro_batch_queue_depth {batching["queue_depth"]}',
+            '# HELP healthcare_ai_micro_batch_rows_total Rows scored by the micro-batcher.',
+            '# TYPE healthcare_ai_micro_batch_rows_total counter',
+            f'healthcare_ai_micro_batch_rows_total {batching["rows"]}',
+            '# HELP healthcare_ai_micro_batches_total Batches scored by the micro-batcher.',
+            '# TYPE healthcare_ai_micro_batches_total counter',
+            f'healthcare_ai_micro_batches_total {batching["batches"]}'
+        ]
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/dataset')
+def dataset_api():
+    ai = ai_system
+    if ai.dataset is None:
+        return jsonify({"error": "Dataset not loaded. Ensure heart.csv is in the correct directory."}), 503
+    try:
+        offset, limit, sort, filters = parse_dataset_query(request.args)
+        return jsonify(ai.dataset_page(offset, limit, sort, filters))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 @app.route('/dataset')
 def show_dataset():
-    if ai_system.dataset is None:
+    ai = ai_system
+    if ai.dataset is None:
         flash('Dataset not loaded. Ensure heart.csv is in the correct directory.', 'error')
         content = "<p>No dataset available. Please ensure the dataset is loaded.</p>"
     else:
         try:
-            # Limited to first 100 rows for performance
-            content = render_template_string(DATASET_HTML,
-                                             dataset=ai_system.dataset.head(100),
-                                             columns=ai_system.dataset.columns)
+            offset, limit, sort, filters = parse_dataset_query(request.args)
+            page = ai.dataset_page(offset, limit, sort, filters)
+        except ValueError as e:
+            flash(str(e), 'error')
+            offset, limit, sort, filters = 0, DATASET_PAGE_SIZE, None, []
+            page = ai.dataset_page(offset, limit)
+        try:
+            content = render(DATASET_TEMPLATE, columns=page['columns'], rows=page['rows'], total=page['total'],
+                             offset=offset, limit=limit, sort=sort, filters=[''.join(f) for f in filters],
+                             dataset_size=len(ai.dataset))
         except Exception as e:
             flash(f"Error displaying dataset: {str(e)}", 'error')
             content = "<p>Error displaying dataset.</p>"
 
     try:
-        response = make_response(render_template_string(BASE_HTML, title="Loaded Dataset", content=content))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        return page_response("Loaded Dataset", content, ai.loaded_at)
     except Exception as e:
         flash(f"Error rendering page: {str(e)}", 'error')
-        response = make_response(
-            render_template_string(BASE_HTML, title="Loaded Dataset", content="<p>Error loading page.</p>"))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        return page_response("Loaded Dataset", "<p>Error loading page.</p>")
 
 @app.route('/model_visualisations')
 def model_visualisations():
-    images_dir = os.path.join(app.root_path, 'static', 'images')
-    if os.path.exists(images_dir):
-        shutil.rmtree(images_dir)
-    os.makedirs(images_dir, exist_ok=True)
-
-    if (ai_system.best_model is None or ai_system.X_test_scaled is None or
-            ai_system.y_test is None or ai_system.features is None):
+    ai = ai_system
+    if (ai.best_model is None or ai.X_test_scaled is None or
+            ai.y_test is None or ai.features is None):
         flash('Cannot generate visualizations: Model or data not available.', 'error')
         content = "<p>No visualizations available. Please ensure the model is trained and data is loaded.</p>"
-        response = make_response(render_template_string(BASE_HTML, title="Model Visualisations", content=content))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        return page_response("Model Visualisations", content)
 
     common_data = {
-        'X_test_scaled': ai_system.X_test_scaled,
-        'y_test': ai_system.y_test,
-        'model': ai_system.best_model
+        'X_test_scaled': ai.X_test_scaled,
+        'y_test': ai.y_test,
+        'model': ai.best_model,
+        'report': ai.evaluation.get(ai.best_model_name)
     }
 
     visualizations = {
@@ -1114,107 +3639,44 @@ def model_visualisations():
         'confusion_matrix': None
     }
 
+    model_version = ai.model_version
+
     # Model Metrics
-    fig = create_visualization('model_metrics', common_data, figsize=(10, 6),
-                               save_path=os.path.join(images_dir, 'model_metrics.png'))
-    if fig:
-        visualizations['model_metrics'] = '/static/images/model_metrics.png'
-        plt.close(fig)
+    visualizations['model_metrics'] = cached_visualization('model_metrics', common_data, model_version,
+                                                           figsize=(10, 6))
 
     # ROC Curve
-    fig = create_visualization('roc_curve', common_data, figsize=(8, 6),
-                               save_path=os.path.join(images_dir, 'roc_curve.png'))
-    if fig:
-        visualizations['roc_curve'] = '/static/images/roc_curve.png'
-        plt.close(fig)
+    visualizations['roc_curve'] = cached_visualization('roc_curve', common_data, model_version, figsize=(8, 6))
 
     # Precision-Recall Curve
-    fig = create_visualization('precision_recall_curve', common_data, figsize=(8, 6),
-                               save_path=os.path.join(images_dir, 'precision_recall_curve.png'))
-    if fig:
-        visualizations['precision_recall_curve'] = '/static/images/precision_recall_curve.png'
-        plt.close(fig)
+    visualizations['precision_recall_curve'] = cached_visualization('precision_recall_curve', common_data,
+                                                                    model_version, figsize=(8, 6))
 
     # Confusion Matrix
-    fig = create_visualization('confusion_matrix', common_data, figsize=(6, 6),
-                               save_path=os.path.join(images_dir, 'confusion_matrix.png'))
-    if fig:
-        visualizations['confusion_matrix'] = '/static/images/confusion_matrix.png'
-        plt.close(fig)
+    visualizations['confusion_matrix'] = cached_visualization('confusion_matrix', common_data, model_version,
+                                                              figsize=(6, 6))
 
     try:
-        # Use only the Model Visualisations section from the VISUALISE_HTML template
-        model_visualisations_html = """
-        <h1 style="margin-bottom: 20px;">Model Performance Visualizations</h1>
-
-        <!-- Model Visualisations Section -->
-        <div style="background: rgba(255, 255, 255, 0.08); border-radius: 8px; padding: 20px; margin-bottom: 30px;">
-            <div style="display: flex; flex-direction: column; gap: 20px;">
-                {% if model_metrics %}
-                <div>
-                    <h3>Model Performance Metrics</h3>
-                    <img src="{{ model_metrics }}" alt="Model Performance Metrics" style="max-width: 100%; border-radius: 8px;">
-                </div>
-                {% endif %}
-                {% if roc_curve %}
-                <div>
-                    <h3>ROC Curve</h3>
-                    <img src="{{ roc_curve }}" alt="ROC Curve" style="max-width: 100%; border-radius: 8px;">
-                </div>
-                {% endif %}
-                {% if precision_recall_curve %}
-                <div>
-                    <h3>Precision-Recall Curve</h3>
-                    <img src="{{ precision_recall_curve }}" alt="Precision-Recall Curve" style="max-width: 100%; border-radius: 8px;">
-                </div>
-                {% endif %}
-                {% if confusion_matrix %}
-                <div>
-                    <h3>Confusion Matrix</h3>
-                    <img src="{{ confusion_matrix }}" alt="Confusion Matrix" style="max-width: 100%; border-radius: 8px;">
-                </div>
-                {% endif %}
-            </div>
-        </div>
-        """
-
-        content = render_template_string(model_visualisations_html, **visualizations)
-        response = make_response(render_template_string(BASE_HTML, title="Model Visualisations", content=content))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        content = render(MODEL_VISUALISATIONS_TEMPLATE, **visualizations)
+        return page_response("Model Visualisations", content, ai.loaded_at)
     except Exception as e:
         flash(f"Error rendering visualisation page: {str(e)}", 'error')
-        response = make_response(render_template_string(BASE_HTML, title="Model Visualisations",
-                                                        content="<p>Error loading visualisations.</p>"))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        return page_response("Model Visualisations", "<p>Error loading visualisations.</p>")
 
 @app.route('/patient_visualisations')
 def patient_visualisations():
-    images_dir = os.path.join(app.root_path, 'static', 'images')
-    if os.path.exists(images_dir):
-        shutil.rmtree(images_dir)
-    os.makedirs(images_dir, exist_ok=True)
-
-    if (ai_system.best_model is None or ai_system.X_test_scaled is None or
-            ai_system.y_test is None or ai_system.features is None):
+    ai = ai_system
+    if (ai.best_model is None or ai.X_test_scaled is None or
+            ai.y_test is None or ai.features is None):
         flash('Cannot generate visualizations: Model or data not available.', 'error')
         content = "<p>No visualizations available. Please ensure the model is trained and data is loaded.</p>"
-        response = make_response(
-            render_template_string(BASE_HTML, title="Patient Result Visualisations", content=content))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        return page_response("Patient Result Visualisations", content)
 
     common_data = {
-        'X_test_scaled': ai_system.X_test_scaled,
-        'y_test': ai_system.y_test,
-        'model': ai_system.best_model
+        'X_test_scaled': ai.X_test_scaled,
+        'y_test': ai.y_test,
+        'model': ai.best_model,
+        'report': ai.evaluation.get(ai.best_model_name)
     }
 
     visualizations = {
@@ -1225,77 +3687,33 @@ def patient_visualisations():
 
     # Feature Importance
     feature_importances = {}
-    if ai_system.best_model_name == 'Logistic Regression':
-        coef = np.abs(ai_system.best_model.coef_[0])
-        feature_importances = dict(zip(ai_system.dummy_columns, coef))
-    elif hasattr(ai_system.best_model, 'feature_importances_'):
-        feature_importances = dict(zip(ai_system.dummy_columns, ai_system.best_model.feature_importances_))
+    if ai.best_model_name == 'Logistic Regression':
+        coef = np.abs(ai.best_model.coef_[0])
+        feature_importances = dict(zip(ai.dummy_columns, coef))
+    elif hasattr(ai.best_model, 'feature_importances_'):
+        feature_importances = dict(zip(ai.dummy_columns, ai.best_model.feature_importances_))
+
+    model_version = ai.model_version
 
     if feature_importances:
-        fig = create_visualization('feature_importance', {'feature_importances': feature_importances},
-                                   figsize=(10, 8), save_path=os.path.join(images_dir, 'feature_importance.png'))
-        if fig:
-            visualizations['feature_importance'] = '/static/images/feature_importance.png'
-            plt.close(fig)
+        visualizations['feature_importance'] = cached_visualization(
+            'feature_importance', {'feature_importances': feature_importances}, model_version, figsize=(10, 8))
 
     # Correlation Matrix
-    fig = create_visualization('correlation_matrix', {'features': ai_system.dataset[ai_system.original_columns]},
-                               figsize=(10, 8), save_path=os.path.join(images_dir, 'correlation_matrix.png'))
-    if fig:
-        visualizations['correlation_matrix'] = '/static/images/correlation_matrix.png'
-        plt.close(fig)
+    visualizations['correlation_matrix'] = cached_visualization(
+        'correlation_matrix', {'features': ai.dataset[ai.original_columns]}, model_version,
+        figsize=(10, 8))
 
     # Patient Distribution
-    fig = create_visualization('patient_distribution', common_data, figsize=(8, 6),
-                               save_path=os.path.join(images_dir, 'patient_distribution.png'))
-    if fig:
-        visualizations['patient_distribution'] = '/static/images/patient_distribution.png'
-        plt.close(fig)
+    visualizations['patient_distribution'] = cached_visualization('patient_distribution', common_data,
+                                                                  model_version, figsize=(8, 6))
 
     try:
-        patient_visualisations_html = """
-        <h1 style="margin-bottom: 20px;">Patient Result Visualizations</h1>
-
-        <!-- Patient Result Visualisations Section -->
-        <div style="background: rgba(255, 255, 255, 0.08); border-radius: 8px; padding: 20px;">
-            <div style="display: flex; flex-direction: column; gap: 20px;">
-                {% if feature_importance %}
-                <div>
-                    <h3>Feature Importance</h3>
-                    <img src="{{ feature_importance }}" alt="Feature Importance" style="max-width: 100%; border-radius: 8px;">
-                </div>
-                {% endif %}
-                {% if correlation_matrix %}
-                <div>
-                    <h3>Correlation Matrix</h3>
-                    <img src="{{ correlation_matrix }}" alt="Correlation Matrix" style="max-width: 100%; border-radius: 8px;">
-                </div>
-                {% endif %}
-                {% if patient_distribution %}
-                <div>
-                    <h3>Patient Distribution</h3>
-                    <img src="{{ patient_distribution }}" alt="Patient Distribution" style="max-width: 100%; border-radius: 8px;">
-                </div>
-                {% endif %}
-            </div>
-        </div>
-        """
-
-        content = render_template_string(patient_visualisations_html, **visualizations)
-        response = make_response(
-            render_template_string(BASE_HTML, title="Patient Result Visualisations", content=content))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        content = render(PATIENT_VISUALISATIONS_TEMPLATE, **visualizations)
+        return page_response("Patient Result Visualisations", content, ai.loaded_at)
     except Exception as e:
         flash(f"Error rendering visualisation page: {str(e)}", 'error')
-        response = make_response(render_template_string(BASE_HTML, title="Patient Result Visualisations",
-                                                        content="<p>Error loading visualisations.</p>"))
-        response.headers['Content-Type'] = 'text/html; charset=utf-8'
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        return response
+        return page_response("Patient Result Visualisations", "<p>Error loading visualisations.</p>")
 
 @app.route('/images/<filename>')
 def serve_image(filename):
@@ -0,0 +1,277 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+import app
+
+# Continuous columns get jittered when the dataset is scaled up; everything else is resampled as-is
+CONTINUOUS_COLUMNS = {'Age': 1.0, 'Trestbps': 5.0, 'Chol': 15.0, 'Thalach': 8.0, 'Oldpeak': 0.3}
+PLOT_TYPES = {
+    'model_metrics': (10, 6),
+    'roc_curve': (8, 6),
+    'precision_recall_curve': (8, 6),
+    'confusion_matrix': (10, 8),
+    'feature_importance': (10, 8),
+    'correlation_matrix': (10, 8),
+    'patient_distribution': (8, 6)
+}
+SAMPLE_PATIENT = {'Age': 63, 'Sex': 1, 'CP': 3, 'Trestbps': 145, 'Chol': 233, 'Fbs': 1, 'Restecg': 0,
+                  'Thalach': 150, 'Exang': 0, 'Oldpeak': 2.3, 'Slope': 0, 'CA': 0, 'Thal': 1}
+
+def timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+def record(results, section, name, rows, times, **extra):
+    entry = {
+        'section': section,
+        'name': name,
+        'rows': rows,
+        'repeat': len(times),
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'max': max(times)
+    }
+    entry.update(extra)
+    results.append(entry)
+    print(f"{section:<15} {name:<32} {rows:>9} rows  median {entry['median'] * 1000:10.3f} ms", file=sys.stderr)
+
+def synthetic_dataset(source, rows, seed):
+    # Resamples heart.csv with replacement and jitters the vitals so larger tables are not pure duplicates
+    base = pd.read_csv(source)
+    if rows == len(base):
+        return base
+    rng = np.random.default_rng(seed)
+    frame = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    for col, spread in CONTINUOUS_COLUMNS.items():
+        if col in frame.columns:
+            values = frame[col].to_numpy(dtype=np.float64) + rng.normal(0.0, spread, rows)
+            values = np.clip(values, base[col].min(), base[col].max())
+            frame[col] = np.round(values, 1) if base[col].dtype.kind == 'f' else np.round(values).astype(base[col].dtype)
+    return frame
+
+def bench_pipeline(results, ai, rows, repeat, train):
+    times, _ = timed(ai.load_data, repeat)
+    record(results, 'pipeline', 'load_data', rows, times)
+    times, _ = timed(ai.preprocess_data, repeat)
+    record(results, 'pipeline', 'preprocess_data', rows, times)
+    if train:
+        times, _ = timed(ai.train_models, 1)
+        record(results, 'pipeline', 'train_models', rows, times, best_model=ai.best_model_name,
+               fit_times=ai.training_report.get('fit_times'))
+        return True
+    return False
+
+def bench_inference(results, ai, rows, repeat):
+    cache_size = ai.prediction_cache.max_size
+    ai.prediction_cache.max_size = 0
+    times, _ = timed(lambda: ai.predict(SAMPLE_PATIENT), repeat * 20)
+    record(results, 'inference', 'predict', rows, times)
+    ai.prediction_cache.max_size = cache_size
+    ai.predict(SAMPLE_PATIENT)
+    times, _ = timed(lambda: ai.predict(SAMPLE_PATIENT), repeat * 20)
+    record(results, 'inference', 'predict_cached', rows, times)
+    frame = ai.dataset[ai.original_columns]
+    times, _ = timed(lambda: ai.predict_batch(frame), repeat)
+    record(results, 'inference', 'predict_batch', rows, times)
+    times, _ = timed(lambda: ai.dataset_page(offset=len(frame) // 2, sort='-Chol', filters=[('Age', '>', '50')]),
+                     repeat)
+    record(results, 'inference', 'dataset_page', rows, times)
+
+def bench_visualizations(results, ai, rows, repeat, workdir):
+    common_data = {
+        'X_test_scaled': ai.X_test_scaled,
+        'y_test': ai.y_test,
+        'model': ai.best_model,
+        'report': ai.evaluation.get(ai.best_model_name)
+    }
+    if hasattr(ai.best_model, 'coef_'):
+        importances = dict(zip(ai.dummy_columns, np.abs(ai.best_model.coef_[0])))
+    else:
+        importances = dict(zip(ai.dummy_columns, ai.best_model.feature_importances_))
+    plot_data = {
+        'feature_importance': {'feature_importances': importances},
+        'correlation_matrix': {'features': ai.dataset[ai.original_columns]}
+    }
+    plt = app.load_pyplot()
+    save_path = os.path.join(workdir, 'plot.png')
+
+    def render(viz_type, figsize):
+        fig = app.create_visualization(viz_type, plot_data.get(viz_type, common_data), figsize=figsize,
+                                       save_path=save_path)
+        if fig:
+            plt.close(fig)
+
+    for viz_type, figsize in PLOT_TYPES.items():
+        times, _ = timed(lambda: render(viz_type, figsize), repeat)
+        record(results, 'visualization', viz_type, rows, times)
+
+def bench_routes(results, ai, rows, repeat):
+    app.ai_system = ai
+    client = app.app.test_client()
+    batch_csv = ai.dataset[ai.original_columns].head(1000).to_csv(index=False)
+    requests = {
+        'GET /': lambda: client.get('/'),
+        'POST /': lambda: client.post('/', data=SAMPLE_PATIENT),
+        'POST /api/predict': lambda: client.post('/api/predict', json=SAMPLE_PATIENT),
+        'POST /api/predict/batch': lambda: client.post('/api/predict/batch', data=batch_csv,
+                                                       content_type='text/csv'),
+        'POST /api/predict/stream': lambda: client.post('/api/predict/stream', data=batch_csv,
+                                                        content_type='text/csv'),
+        'GET /api/model_metrics': lambda: client.get('/api/model_metrics'),
+        'GET /dataset': lambda: client.get('/dataset?sort=-Chol&offset=100'),
+        'GET /api/dataset': lambda: client.get('/api/dataset?sort=-Chol&offset=100'),
+        'GET /model_visualisations': lambda: client.get('/model_visualisations'),
+        'GET /patient_visualisations': lambda: client.get('/patient_visualisations')
+    }
+
+    def fetch(send):
+        # Reads the whole body inside the timing so streamed responses are fully generated
+        response = send()
+        body = response.get_data()
+        response.close()
+        return response.status_code, len(body)
+
+    for name, send in requests.items():
+        if name.endswith('visualisations'):
+            # First hit renders the plots for this model version, later hits are served from the cache
+            shutil.rmtree(app.VIZ_CACHE_DIR, ignore_errors=True)
+            times, (status, size) = timed(lambda: fetch(send), 1)
+            record(results, 'route', name + ' (cold)', rows, times, status=status, bytes=size)
+        times, (status, size) = timed(lambda: fetch(send), repeat)
+        record(results, 'route', name, rows, times, status=status, bytes=size)
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=app.app.root_path).stdout.strip() or None
+    except OSError:
+        commit = None
+    versions = {}
+    for package in ['numpy', 'pandas', 'scikit-learn', 'xgboost', 'matplotlib', 'flask']:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions,
+        'startup_seconds': app.STARTUP_SECONDS
+    }
+
+def compare(results, baseline_path, tolerance):
+    # Median-to-median comparison against an earlier run; returns the entries that got slower
+    with open(baseline_path) as f:
+        baseline = {(r['section'], r['name'], r['rows']): r for r in json.load(f)['results']}
+    regressions = []
+    for entry in results:
+        previous = baseline.get((entry['section'], entry['name'], entry['rows']))
+        if previous is None or previous['median'] <= 0:
+            continue
+        ratio = entry['median'] / previous['median']
+        entry['baseline_median'] = previous['median']
+        entry['ratio'] = ratio
+        if ratio > 1.0 + tolerance:
+            regressions.append(entry)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark training, inference, plotting and page rendering.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[303, 10000, 100000, 1000000],
+                        help="Dataset sizes to benchmark (heart.csv is resampled to each size)")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed repetitions per measurement")
+    parser.add_argument('--train-max-rows', type=int, default=100000,
+                        help="Largest dataset to train on; bigger sizes reuse the heart.csv models")
+    parser.add_argument('--sections', nargs='+', default=['pipeline', 'inference', 'visualization', 'route'],
+                        choices=['pipeline', 'inference', 'visualization', 'route'])
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the synthetic datasets")
+    parser.add_argument('--output', default='-', help="JSON results file ('-' for stdout)")
+    parser.add_argument('--compare', help="Earlier JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown before a measurement counts as a regression")
+    args = parser.parse_args()
+
+    base = app.ai_system
+    if base.best_model is None:
+        sys.exit("Model not trained. Check dataset and preprocessing.")
+    workdir = tempfile.mkdtemp(prefix='healthcare-ai-bench-')
+    saved = {name: getattr(app, name)
+             for name in ('ARTIFACT_DIR', 'DATASET_STORE_DIR', 'VIZ_CACHE_DIR', 'SERVE_ONLY', 'DATASET_PATH')}
+    # Keep benchmark artifacts and plots out of the served directories
+    app.ARTIFACT_DIR = os.path.join(workdir, 'artifacts')
+    app.DATASET_STORE_DIR = os.path.join(workdir, 'datasets')
+    app.VIZ_CACHE_DIR = os.path.join(workdir, 'plots')
+    app.SERVE_ONLY = True
+    source_path = app.DATASET_PATH
+    results = []
+    try:
+        for rows in args.rows:
+            # Every HealthcareAI stage reads DATASET_PATH, so it points at the synthetic file for the whole size
+            app.DATASET_PATH = os.path.join(workdir, f'heart-{rows}.csv')
+            synthetic_dataset(source_path, rows, args.seed).to_csv(app.DATASET_PATH, index=False)
+            ai = app.HealthcareAI()
+            trained = False
+            if 'pipeline' in args.sections:
+                trained = bench_pipeline(results, ai, rows, args.repeat, rows <= args.train_max_rows)
+            else:
+                ai.preprocess_data()
+            if not trained:
+                ai.models, ai.best_model_name, ai.best_model = base.models, base.best_model_name, base.best_model
+                ai.evaluation, ai.model_accuracies = base.evaluation, base.model_accuracies
+                ai.native_model, ai.native_error = base.native_model, base.native_error
+                # The borrowed models expect base's encoding and scaling, so the held-out rows are re-encoded with it
+                ai.preprocessor = base.preprocessor
+                ai.preprocess_data(fit_scaler=False)
+            ai.model_version = f'bench-{rows}'
+            if 'inference' in args.sections:
+                bench_inference(results, ai, rows, args.repeat)
+            if 'visualization' in args.sections:
+                bench_visualizations(results, ai, rows, args.repeat, workdir)
+            if 'route' in args.sections:
+                bench_routes(results, ai, rows, args.repeat)
+    finally:
+        for name, value in saved.items():
+            setattr(app, name, value)
+        app.ai_system = base
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = compare(results, args.compare, args.tolerance) if args.compare else []
+    report = {'environment': environment(), 'results': results}
+    if args.compare:
+        report['baseline'] = args.compare
+        report['regressions'] = [f"{r['section']} {r['name']} @ {r['rows']}: {r['ratio']:.2f}x" for r in regressions]
+    text = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    for line in report.get('regressions', []):
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
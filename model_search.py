@@ -0,0 +1,147 @@
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+
+import numpy as np
+
+# Cross-validated hyperparameter search with successive halving over folds: every configuration is scored
+# on the first fold, the best third move on to more folds, and only the finalists see all of them. Each
+# (configuration, fold) result is written to disk, so an interrupted search resumes where it stopped.
+# Kept out of app.py so pool workers import only this module and the estimator libraries. Workers are spawned
+# rather than forked: the server process has threads running whose locks a forked child could inherit held.
+
+worker_data = {}
+
+def init_worker(X, y):
+    worker_data['X'] = X
+    worker_data['y'] = y
+
+def evaluate(task):
+    X, y = worker_data['X'], worker_data['y']
+    module, class_name = task['estimator']
+    model = getattr(import_module(module), class_name)(**task['params'])
+    start = time.process_time()
+    model.fit(X[task['train']], y[task['train']])
+    fit_seconds = time.process_time() - start
+    score = float(np.mean(model.predict(X[task['validation']]) == y[task['validation']]))
+    return {'score': score, 'fit_seconds': fit_seconds}
+
+def expand_grid(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def halving_schedule(n_folds, factor):
+    # Folds evaluated per rung, e.g. 5 folds with factor 3 gives [1, 2, 5]
+    rungs = 0
+    while factor ** rungs < n_folds:
+        rungs += 1
+    schedule = [max(1, math.ceil(n_folds / factor ** (rungs - i))) for i in range(rungs + 1)]
+    return sorted(set(schedule))
+
+def task_key(name, estimator, params, fold, n_folds, seed):
+    text = json.dumps([name, list(estimator), sorted(params.items()), fold, n_folds, seed], default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+def load_result(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_result(path, result):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(result, f)
+    os.replace(tmp_path, path)
+
+def search(X, y, estimators, base_params, space, n_folds=5, factor=3, workers=0, budget_seconds=0.0,
+           cache_dir=None, seed=42, fixed_params=None):
+    X = np.ascontiguousarray(X)
+    y = np.asarray(y)
+    stratified = import_module('sklearn.model_selection').StratifiedKFold(n_splits=n_folds, shuffle=True,
+                                                                        random_state=seed)
+    folds = list(stratified.split(X, y))
+    data_key = hashlib.sha256(X.tobytes() + y.tobytes()).hexdigest()[:16]
+    if cache_dir is not None:
+        cache_dir = os.path.join(cache_dir, data_key)
+        os.makedirs(cache_dir, exist_ok=True)
+    fixed_params = fixed_params or {}
+    candidates = {}
+    for name, grid in space.items():
+        configs = []
+        for params in expand_grid(grid):
+            full_params = dict(base_params.get(name, {}), **params, **fixed_params.get(name, {}))
+            configs.append({'params': params, 'full_params': full_params, 'scores': {}})
+        candidates[name] = configs
+    workers = max(1, workers or os.cpu_count() or 1)
+    schedule = halving_schedule(n_folds, factor)
+    stats = {'tasks_run': 0, 'tasks_cached': 0, 'cpu_seconds': 0.0, 'budget_exhausted': False,
+             'schedule': schedule, 'workers': workers}
+    wall_start = time.perf_counter()
+    survivors = {name: list(configs) for name, configs in candidates.items()}
+    executor = None
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=init_worker, initargs=(X, y))
+    else:
+        init_worker(X, y)
+    try:
+        for rung, rung_folds in enumerate(schedule):
+            if budget_seconds and stats['cpu_seconds'] >= budget_seconds:
+                stats['budget_exhausted'] = True
+                break
+            pending = []
+            for name, configs in survivors.items():
+                for config in configs:
+                    for fold in range(rung_folds):
+                        if fold in config['scores']:
+                            continue
+                        key = task_key(name, estimators[name], config['full_params'], fold, n_folds, seed)
+                        path = os.path.join(cache_dir, f'{key}.json') if cache_dir is not None else None
+                        cached = load_result(path) if path is not None else None
+                        if cached is not None:
+                            config['scores'][fold] = cached['score']
+                            stats['tasks_cached'] += 1
+                            continue
+                        train, validation = folds[fold]
+                        task = {'estimator': estimators[name], 'params': config['full_params'],
+                                'train': train, 'validation': validation}
+                        pending.append((config, fold, path, task))
+            if executor is not None:
+                results = executor.map(evaluate, [task for _, _, _, task in pending])
+            else:
+                results = map(evaluate, [task for _, _, _, task in pending])
+            for (config, fold, path, _), result in zip(pending, results):
+                config['scores'][fold] = result['score']
+                stats['tasks_run'] += 1
+                stats['cpu_seconds'] += result['fit_seconds']
+                if path is not None:
+                    save_result(path, result)
+            if rung < len(schedule) - 1:
+                # Keep the best 1/factor of each model's configurations for the next rung
+                for name, configs in survivors.items():
+                    configs.sort(key=lambda config: -np.mean([config['scores'][f] for f in range(rung_folds)]))
+                    survivors[name] = configs[:max(1, math.ceil(len(configs) / factor))]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    stats['wall_seconds'] = time.perf_counter() - wall_start
+    models = {}
+    for name, configs in survivors.items():
+        # Finalists are compared on the folds they all completed
+        completed = min(len(config['scores']) for config in configs)
+        best = max(configs, key=lambda config: np.mean([config['scores'][f] for f in range(completed)]))
+        models[name] = {
+            'params': best['params'],
+            'cv_accuracy': float(np.mean([best['scores'][f] for f in range(completed)])),
+            'folds': completed,
+            'configurations': len(candidates[name])
+        }
+    return {'models': models, **stats}
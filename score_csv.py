@@ -0,0 +1,30 @@
+import argparse
+import sys
+
+from app import ai_system, BATCH_CHUNK_SIZE
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a patient CSV in fixed-size chunks.")
+    parser.add_argument('input', help="Patient CSV to score ('-' for stdin)")
+    parser.add_argument('output', nargs='?', default='-', help="Destination CSV ('-' for stdout)")
+    parser.add_argument('--chunk-size', type=int, default=BATCH_CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="Decision threshold (default: the configured operating point, else 0.5)")
+    parser.add_argument('--explain', action='store_true',
+                        help="Add one contribution_<field> column per field from the best model")
+    args = parser.parse_args()
+
+    if ai_system.best_model is None:
+        sys.exit("Model not trained. Check dataset and preprocessing.")
+    source = sys.stdin.buffer if args.input == '-' else args.input
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        for text in ai_system.iter_scored_csv(source, threshold=args.threshold, chunk_size=args.chunk_size,
+                                              explain=args.explain):
+            output.write(text)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app reads its configuration and trains at import, so the environment is set first. Artifacts and dataset
+# stores go to a scratch directory rather than the repository's store.
+ARTIFACT_DIR = tempfile.mkdtemp(prefix='healthcare-ai-tests-')
+atexit.register(shutil.rmtree, ARTIFACT_DIR, True)
+os.environ['HEALTHCARE_AI_DATASET'] = os.path.join(ROOT, 'heart.csv')
+os.environ['HEALTHCARE_AI_ARTIFACT_DIR'] = ARTIFACT_DIR
+
+import app  # noqa: E402
+
+PATIENT = {'Age': '63', 'Sex': '1', 'CP': '3', 'Trestbps': '145', 'Chol': '233', 'Fbs': '1', 'Restecg': '0',
+           'Thalach': '150', 'Exang': '0', 'Oldpeak': '2.3', 'Slope': '0', 'CA': '0', 'Thal': '1'}
+
+
+@pytest.fixture
+def patient():
+    return dict(PATIENT)
+
+
+@pytest.fixture
+def patient_data():
+    data, error = app.validate_patient(PATIENT, app.ai_system.original_columns)
+    assert error is None
+    return data
+
+
+@pytest.fixture
+def client():
+    app.app.config['TESTING'] = True
+    with app.app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def artifact_dir(tmp_path, monkeypatch):
+    # A private artifact store, so the generation under test trains instead of loading the session's models
+    monkeypatch.setattr(app, 'ARTIFACT_DIR', str(tmp_path))
+    return tmp_path
@@ -0,0 +1,27 @@
+import os
+
+import app
+
+
+def test_second_generation_loads_the_stored_artifact(patient_data):
+    trained = app.ai_system
+    loaded = app.HealthcareAI()
+    assert loaded.model_version == trained.model_version
+    assert isinstance(loaded.models, app.ArtifactModels)
+    assert loaded.best_model_name == trained.best_model_name
+    assert loaded.predict(patient_data)['probability'] == trained.predict(patient_data)['probability']
+
+
+def test_training_publishes_a_versioned_directory(artifact_dir):
+    ai = app.HealthcareAI()
+    assert ai.model_version is not None
+    assert os.path.isfile(os.path.join(artifact_dir, ai.model_version, 'meta.joblib'))
+    assert not [name for name in os.listdir(artifact_dir) if name.startswith('.tmp-')]
+
+
+def test_key_changes_with_the_model_parameters(monkeypatch):
+    ai = app.ai_system
+    params = {name: dict(values) for name, values in app.MODEL_PARAMS.items()}
+    params['Random Forest']['n_estimators'] = 10
+    monkeypatch.setattr(app, 'MODEL_PARAMS', params)
+    assert ai.artifact_key() != ai.model_version
@@ -0,0 +1,41 @@
+import app
+
+
+def test_batch_scores_valid_rows_and_reports_invalid_ones(client, patient, patient_data):
+    rows = [patient, dict(patient, Age='abc'), dict(patient, Sex='7')]
+    response = client.post('/api/predict/batch', json={'patients': rows})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result['row'] for result in body['results']] == [0]
+    assert abs(body['results'][0]['probability'] - app.ai_system.predict(patient_data)['probability']) < 1e-12
+    assert [error['row'] for error in body['errors']] == [1, 2]
+    assert 'Age' in body['errors'][0]['error'] and 'Sex' in body['errors'][1]['error']
+
+
+def test_batch_accepts_a_csv_body(client, patient):
+    csv = ','.join(patient) + '\n' + ','.join(patient.values()) + '\n'
+    response = client.post('/api/predict/batch', data=csv, content_type='text/csv')
+    assert response.status_code == 200
+    assert len(response.get_json()['results']) == 1
+
+
+def test_batch_rejects_unparseable_requests(client):
+    assert client.post('/api/predict/batch', json={'patients': 'nope'}).status_code == 400
+    assert client.post('/api/predict/batch', data='x', content_type='text/plain').status_code == 400
+    assert client.post('/api/predict/batch?threshold=high', json=[]).status_code == 400
+
+
+def test_batch_rejects_oversized_requests(client, patient, monkeypatch):
+    monkeypatch.setattr(app, 'BATCH_MAX_ROWS', 2)
+    assert client.post('/api/predict/batch', json=[patient] * 3).status_code == 413
+
+
+def test_non_finite_rows_are_rejected_and_the_rest_scored(client, patient):
+    rows = [dict(patient, Oldpeak='inf'), dict(patient, Oldpeak='1.0'), dict(patient, Chol='nan'),
+            dict(patient, Oldpeak='-inf')]
+    response = client.post('/api/predict/batch', json=rows)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result['row'] for result in body['results']] == [1]
+    assert [error['row'] for error in body['errors']] == [0, 2, 3]
+    assert 'Oldpeak' in body['errors'][0]['error'] and 'Chol' in body['errors'][1]['error']
@@ -0,0 +1,51 @@
+import json
+import sys
+
+import numpy as np
+import pytest
+
+import app
+import benchmark
+
+
+def test_synthetic_dataset_resamples_within_the_source_range():
+    source = benchmark.pd.read_csv(app.DATASET_PATH)
+    frame = benchmark.synthetic_dataset(app.DATASET_PATH, 1000, seed=1)
+    assert len(frame) == 1000 and list(frame.columns) == list(source.columns)
+    for col in benchmark.CONTINUOUS_COLUMNS:
+        assert source[col].min() <= frame[col].min() and frame[col].max() <= source[col].max()
+    assert frame.equals(benchmark.synthetic_dataset(app.DATASET_PATH, 1000, seed=1))
+
+
+def test_run_and_compare(tmp_path, monkeypatch):
+    output = tmp_path / 'baseline.json'
+    argv = ['benchmark.py', '--rows', '303', '--repeat', '1', '--sections', 'inference', '--output', str(output)]
+    monkeypatch.setattr(sys, 'argv', argv)
+    settings = {name: getattr(app, name) for name in ('ARTIFACT_DIR', 'DATASET_STORE_DIR', 'VIZ_CACHE_DIR',
+                                                      'SERVE_ONLY', 'DATASET_PATH')}
+    benchmark.main()
+    assert {name: getattr(app, name) for name in settings} == settings
+    report = json.loads(output.read_text())
+    assert {entry['name'] for entry in report['results']} >= {'predict', 'predict_batch', 'dataset_page'}
+    assert app.ai_system.model_version != 'bench-303'
+
+    for entry in report['results']:
+        entry['median'] /= 100
+    output.write_text(json.dumps(report))
+    monkeypatch.setattr(sys, 'argv', argv[:-1] + [str(tmp_path / 'run.json'), '--compare', str(output)])
+    with pytest.raises(SystemExit) as exit_info:
+        benchmark.main()
+    assert exit_info.value.code == 1
+    assert json.loads((tmp_path / 'run.json').read_text())['regressions']
+
+
+def test_untrained_sizes_serve_the_borrowed_models_with_their_preprocessor(tmp_path, monkeypatch):
+    served = []
+    monkeypatch.setattr(benchmark, 'bench_inference', lambda results, ai, rows, repeat: served.append(ai))
+    monkeypatch.setattr(sys, 'argv', ['benchmark.py', '--rows', '500', '--sections', 'inference',
+                                      '--output', str(tmp_path / 'run.json')])
+    benchmark.main()
+    ai, base = served[0], app.ai_system
+    assert ai.preprocessor is base.preprocessor and ai.best_model is base.best_model
+    expected = base.preprocessor.transform(ai.features.iloc[ai.features.index.get_indexer(ai.test_index)])
+    np.testing.assert_array_equal(ai.X_test_scaled, expected)
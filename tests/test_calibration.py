@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from sklearn.isotonic import IsotonicRegression
+
+import app
+
+
+def test_isotonic_calibrator_matches_sklearn():
+    rng = np.random.default_rng(0)
+    probability = rng.uniform(size=300)
+    y_true = (rng.uniform(size=300) < probability ** 2).astype(int)
+    calibrator = app.Calibrator(app.Calibrator.fit('isotonic', probability, y_true).state())
+    isotonic = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(probability, y_true)
+    grid = np.linspace(-0.1, 1.1, 50)
+    np.testing.assert_allclose(calibrator.apply(grid), isotonic.predict(grid))
+
+
+def test_sigmoid_calibrator_is_monotone():
+    rng = np.random.default_rng(1)
+    probability = rng.uniform(size=300)
+    calibrator = app.Calibrator.fit('sigmoid', probability, (rng.uniform(size=300) < probability).astype(int))
+    assert np.all(np.diff(calibrator.apply(np.linspace(0.01, 0.99, 50))) > 0)
+
+
+def test_operating_points_reach_their_targets():
+    ai = app.ai_system
+    y_true = np.asarray(ai.y_test)
+    probability = ai.evaluation[ai.best_model_name]['y_prob']
+    table = app.operating_points(y_true, probability)
+    threshold, sensitivity, specificity = app.lookup_operating_point(table, 'sensitivity:0.9')
+    predicted = probability >= threshold
+    assert sensitivity >= 0.9 and np.mean(predicted[y_true == 1]) == sensitivity
+    assert np.mean(~predicted[y_true == 0]) == specificity
+    with pytest.raises(ValueError):
+        app.lookup_operating_point(table, 'recall:0.9')
+    with pytest.raises(ValueError):
+        app.lookup_operating_point(table, 'specificity:2')
+
+
+def test_operating_point_requests(client, patient):
+    body = client.post('/api/predict?operating_point=specificity:0.9', json=patient).get_json()
+    assert body['operating_point']['name'] == 'specificity:0.9' and body['operating_point']['specificity'] >= 0.9
+    assert body['threshold'] == app.lookup_operating_point(app.ai_system.operating_points, 'specificity:0.9')[0]
+    assert client.post('/api/predict?operating_point=best', json=patient).status_code == 400
+
+
+def test_calibrated_generation_serves_calibrated_probabilities(artifact_dir, monkeypatch, patient_data):
+    monkeypatch.setattr(app, 'CALIBRATION', 'isotonic')
+    monkeypatch.setattr(app, 'OPERATING_POINT', 'youden')
+    ai = app.HealthcareAI()
+    assert ai.calibrator.method == 'isotonic'
+    assert ai.training_report['calibration']['method'] == 'isotonic'
+    assert ai.default_threshold == ai.operating_points['youden']['threshold']
+    raw = ai.models[ai.best_model_name].predict_proba(ai.preprocessor.transform_row(patient_data))[0, 1]
+    assert ai.predict(patient_data)['probability'] == pytest.approx(ai.calibrator.apply(raw))
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('name', ['Logistic Regression', 'Random Forest', 'XGBoost'])
+def test_contributions_add_up_to_the_model_output(name):
+    ai = app.ai_system
+    native = app.NativeModel.export(ai.models[name], ai.preprocessor.mean, ai.preprocessor.std)
+    base, contributions = native.contributions(ai.X_test_scaled)
+    output = base + contributions.sum(axis=1)
+    probability = native.positive_proba(ai.X_test_scaled)
+    if native.output_scale == 'log_odds':
+        output = 1.0 / (1.0 + np.exp(-output))
+    np.testing.assert_allclose(output, probability, atol=1e-9)
+
+
+def test_prediction_explanations(client, patient):
+    body = client.post('/api/predict', json=patient).get_json()
+    explanation = body['explanation']
+    assert explanation['model'] == app.ai_system.best_model_name
+    assert set(explanation['contributions']) == set(app.ai_system.original_columns)
+    output = explanation['base'] + sum(explanation['contributions'].values())
+    if explanation['scale'] == 'log_odds':
+        output = 1.0 / (1.0 + np.exp(-output))
+    assert output == pytest.approx(body['probability']) == pytest.approx(explanation['model_probability'])
+
+
+def test_calibrated_predictions_explain_the_uncalibrated_model(client, patient, monkeypatch):
+    ai = app.ai_system
+    evaluation = ai.evaluation[ai.best_model_name]
+    monkeypatch.setattr(ai, 'calibrator', app.Calibrator.fit('sigmoid', 1.0 - evaluation['y_prob'],
+                                                             np.asarray(ai.y_test)))
+    monkeypatch.setattr(ai, 'prediction_cache', app.PredictionCache())
+    body = client.post('/api/predict', json=patient).get_json()
+    explanation = body['explanation']
+    output = explanation['base'] + sum(explanation['contributions'].values())
+    if explanation['scale'] == 'log_odds':
+        output = 1.0 / (1.0 + np.exp(-output))
+    assert output == pytest.approx(explanation['model_probability'])
+    assert explanation['model_probability'] != pytest.approx(body['probability'])
+    batch = client.post('/api/predict/batch?explain=1', json=[patient]).get_json()
+    assert batch['results'][0]['model_probability'] == pytest.approx(explanation['model_probability'])
+    page = client.post('/', data=patient).get_data(as_text=True)
+    assert f"Main factors in the {ai.best_model_name} score of" in page
+
+
+def test_batch_explanations_match_single_ones(client, patient):
+    single = client.post('/api/predict', json=patient).get_json()['explanation']
+    batch = client.post('/api/predict/batch?explain=1', json=[patient]).get_json()
+    assert batch['explanation']['base'] == pytest.approx(single['base'])
+    assert batch['results'][0]['contributions'] == pytest.approx(single['contributions'])
+
+
+def test_top_contributions_are_ordered_by_magnitude():
+    explanation = {'contributions': {'Age': 0.1, 'Chol': -0.5, 'CP': 0.3}}
+    assert app.top_contributions(explanation, count=2) == [('Chol', -0.5), ('CP', 0.3)]
+    assert app.top_contributions(None) == []
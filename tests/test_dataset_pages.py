@@ -0,0 +1,32 @@
+from werkzeug.datastructures import MultiDict
+
+import app
+
+
+def test_pages_slice_the_dataset(client):
+    body = client.get('/api/dataset?offset=10&limit=5').get_json()
+    dataset = app.ai_system.dataset
+    assert body['total'] == len(dataset) and body['offset'] == 10 and body['limit'] == 5
+    assert [row[0] for row in body['rows']] == dataset['Age'].iloc[10:15].tolist()
+
+
+def test_sort_and_filter(client):
+    body = client.get('/api/dataset?sort=-Chol&filter=Age>=60,Sex==1&limit=1000').get_json()
+    dataset = app.ai_system.dataset
+    expected = dataset[(dataset['Age'] >= 60) & (dataset['Sex'] == 1)]
+    chol = body['columns'].index('Chol')
+    assert body['total'] == len(expected)
+    assert [row[chol] for row in body['rows']] == sorted(expected['Chol'].tolist(), reverse=True)
+
+
+def test_limit_is_capped():
+    assert app.ai_system.dataset_page(0, app.DATASET_MAX_PAGE_SIZE)['limit'] == app.DATASET_MAX_PAGE_SIZE
+    offset, limit, _, _ = app.parse_dataset_query(MultiDict({'limit': '100000', 'offset': '-3'}))
+    assert (offset, limit) == (0, app.DATASET_MAX_PAGE_SIZE)
+
+
+def test_bad_queries_are_rejected(client):
+    assert client.get('/api/dataset?filter=Age~3').status_code == 400
+    assert client.get('/api/dataset?sort=Height').status_code == 400
+    assert client.get('/api/dataset?filter=Age>=old').status_code == 400
+    assert client.get('/dataset?sort=Height').status_code == 200
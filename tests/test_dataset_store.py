@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'DATASET_STORE', True)
+    monkeypatch.setattr(app, 'DATASET_STORE_DIR', str(tmp_path / 'datasets'))
+    return tmp_path / 'datasets'
+
+
+def test_store_holds_the_csv_values_in_compact_types(store_dir):
+    expected = pd.read_csv(app.DATASET_PATH)
+    stored = app.read_dataset(app.DATASET_PATH)
+    assert list(stored.columns) == list(expected.columns)
+    for col in expected.columns:
+        np.testing.assert_array_equal(stored[col].to_numpy(np.float64), expected[col].to_numpy(np.float64))
+    assert stored['Age'].dtype == np.uint8
+    assert isinstance(stored['Age'].to_numpy().base, np.memmap)
+    # 2.3 and friends have no exact float32 image, so Oldpeak keeps the CSV's doubles
+    assert stored['Oldpeak'].dtype == np.float64
+
+
+def test_store_is_reused_and_replaced_when_the_file_changes(store_dir, tmp_path):
+    path = tmp_path / 'heart.csv'
+    frame = pd.read_csv(app.DATASET_PATH)
+    frame.to_csv(path, index=False)
+    app.read_dataset(str(path))
+    first = os.listdir(store_dir)
+    app.read_dataset(str(path))
+    assert os.listdir(store_dir) == first
+    frame.iloc[:-1].to_csv(path, index=False)
+    os.utime(path, ns=(1, 1))
+    assert len(app.read_dataset(str(path))) == len(frame) - 1
+    assert len(os.listdir(store_dir)) == 1 and os.listdir(store_dir) != first
+
+
+def test_compact_column_types():
+    assert app.compact_column(pd.Series([0.5, 1.25]))[0].dtype == np.float32
+    assert app.compact_column(pd.Series([0.1, 2.3]))[0].dtype == np.float64
+    assert app.compact_column(pd.Series([-3, 100]))[0].dtype == np.int8
+    codes, categories = app.compact_column(pd.Series(['b', 'a', None]))
+    assert codes.tolist() == [1, 0, -1] and categories == ['a', 'b']
@@ -0,0 +1,84 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import app
+
+
+class SlowModel:
+    def __init__(self, probability, delay):
+        self.probability = probability
+        self.delay = delay
+
+    def predict_proba(self, X):
+        time.sleep(self.delay)
+        return np.tile([1.0 - self.probability, self.probability], (len(X), 1))
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(app, 'ensemble_executor', executor)
+    yield executor
+    executor.shutdown()
+
+
+def test_soft_vote_skips_models_over_budget_but_waits_for_the_primary(executor):
+    models = {'primary': SlowModel(0.8, 0.05), 'fast': SlowModel(0.4, 0.0), 'slow': SlowModel(0.1, 1.0)}
+    ensemble = app.Ensemble(models, 'primary', method='soft_vote')
+    combined, probabilities, skipped = ensemble.score(np.zeros((1, 3)), budget=0.01)
+    assert skipped == ['slow'] and set(probabilities) == {'primary', 'fast'}
+    assert combined[0] == pytest.approx(0.6)
+    assert ensemble.agreement(probabilities, [1]).tolist() == [0.5]
+
+
+class FailingModel:
+    def predict_proba(self, X):
+        raise ValueError('broken member')
+
+
+def test_a_failed_member_is_skipped(executor):
+    ensemble = app.Ensemble({'primary': SlowModel(0.8, 0.0), 'broken': FailingModel()}, 'primary', method='soft_vote')
+    for budget in (0.5, None):
+        combined, probabilities, skipped = ensemble.score(np.zeros((1, 3)), budget=budget)
+        assert skipped == ['broken'] and combined[0] == pytest.approx(0.8)
+
+
+def test_a_member_still_busy_is_not_given_more_work(executor):
+    slow = SlowModel(0.1, 0.3)
+    calls = []
+    slow_predict = slow.predict_proba
+    slow.predict_proba = lambda X: calls.append(len(X)) or slow_predict(X)
+    ensemble = app.Ensemble({'primary': SlowModel(0.8, 0.0), 'slow': slow}, 'primary', method='soft_vote')
+    for _ in range(3):
+        assert ensemble.score(np.zeros((1, 3)), budget=0.01)[2] == ['slow']
+    assert calls == [1]
+    # Without a budget every member is awaited, busy or not
+    assert set(ensemble.score(np.zeros((1, 3)))[1]) == {'primary', 'slow'}
+
+
+def test_stacking_falls_back_to_the_average_without_every_model():
+    weights = {'names': ['a', 'b'], 'coef': np.array([2.0, 1.0]), 'intercept': -1.0}
+    ensemble = app.Ensemble({'a': None, 'b': None}, 'a', method='stacking', weights=weights)
+    assert ensemble.method == 'stacking'
+    stacked = ensemble.combine({'a': np.array([0.5]), 'b': np.array([0.5])})
+    assert stacked[0] == pytest.approx(1.0 / (1.0 + np.exp(-0.5)))
+    assert ensemble.combine({'a': np.array([0.5])})[0] == 0.5
+    assert app.Ensemble({'a': None}, 'a', method='stacking', weights=weights).method == 'soft_vote'
+
+
+def test_stacked_generation_serves_every_model(executor, artifact_dir, monkeypatch, client, patient):
+    monkeypatch.setattr(app, 'ENSEMBLE_METHOD', 'stacking')
+    monkeypatch.setattr(app, 'ENSEMBLE_BUDGET_MS', 10000)
+    ai = app.HealthcareAI()
+    assert ai.ensemble.method == 'stacking' and set(ai.ensemble.models) == set(app.MODEL_PARAMS)
+    assert ai.training_report['ensemble']['method'] == 'stacking'
+    monkeypatch.setattr(app, 'ai_system', ai)
+    body = client.post('/api/predict', json=patient).get_json()
+    assert body['ensemble'] == 'stacking' and set(body['models']) == set(app.MODEL_PARAMS)
+    expected = ai.ensemble.combine({name: np.array([value]) for name, value in body['models'].items()})[0]
+    assert body['probability'] == pytest.approx(expected)
+    batch = client.post('/api/predict/batch', json=[patient]).get_json()
+    assert batch['results'][0]['probability'] == pytest.approx(body['probability'])
@@ -0,0 +1,20 @@
+import numpy as np
+
+import app
+
+
+def test_reports_are_computed_for_every_model():
+    ai = app.ai_system
+    assert set(ai.evaluation) == set(app.MODEL_PARAMS)
+    for name, report in ai.evaluation.items():
+        model = ai.models[name]
+        np.testing.assert_array_equal(report['y_pred'], model.predict(ai.X_test_scaled))
+        assert report['accuracy'] == np.mean(report['y_pred'] == np.asarray(ai.y_test))
+        assert report['confusion_matrix'].sum() == len(ai.y_test)
+        assert ai.model_accuracies[name]['test_accuracy'] == report['accuracy'] * 100
+
+
+def test_model_metrics_serves_the_stored_reports(client):
+    body = client.get('/api/model_metrics').get_json()
+    assert body['best_model'] == app.ai_system.best_model_name
+    assert body['models'] == {name: app.scalar_metrics(report) for name, report in app.ai_system.evaluation.items()}
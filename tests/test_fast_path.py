@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+import app
+
+
+def test_transform_row_matches_the_frame_transform(patient_data):
+    preprocessor = app.ai_system.preprocessor
+    row = preprocessor.transform_row(patient_data)
+    frame = preprocessor.transform(pd.DataFrame([patient_data]))
+    np.testing.assert_array_equal(row, frame)
+
+
+def test_missing_fields_use_the_training_fill_values(patient_data):
+    preprocessor = app.ai_system.preprocessor
+    del patient_data['Chol']
+    row = preprocessor.transform_row(patient_data)
+    filled = preprocessor.transform_row(dict(patient_data, Chol=preprocessor.fill_values['Chol']))
+    np.testing.assert_array_equal(row, filled)
+
+
+def test_predict_matches_the_estimator(patient_data):
+    ai = app.ai_system
+    scaled = ai.preprocessor.transform(pd.DataFrame([patient_data]))
+    expected = ai.models[ai.best_model_name].predict_proba(scaled)[0, 1]
+    assert abs(ai.predict(patient_data)['probability'] - expected) < 1e-12
@@ -0,0 +1,45 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+import app
+
+
+@pytest.fixture
+def dataset(artifact_dir, tmp_path, monkeypatch):
+    path = tmp_path / 'heart.csv'
+    shutil.copy(app.DATASET_PATH, path)
+    monkeypatch.setattr(app, 'DATASET_PATH', str(path))
+    monkeypatch.setattr(app, 'ai_system', app.HealthcareAI())
+    return path
+
+
+def test_reloader_swaps_in_a_generation_for_the_changed_file(dataset, client):
+    reloader = app.ModelReloader(interval=60)
+    current = app.ai_system
+    assert reloader.check() is False
+    pd.read_csv(dataset).iloc[:-20].to_csv(dataset, index=False)
+    assert reloader.check() is True
+    assert app.ai_system is not current
+    assert app.ai_system.model_version != current.model_version
+    assert len(app.ai_system.dataset) == len(current.dataset) - 20
+    assert client.get('/api/model_metrics').get_json()['model_version'] == app.ai_system.model_version
+
+
+def test_failed_retraining_keeps_the_serving_generation_and_is_retried(dataset, monkeypatch):
+    reloader = app.ModelReloader(interval=60)
+    current = app.ai_system
+    pd.read_csv(dataset).iloc[:-20].to_csv(dataset, index=False)
+
+    def fail(previous=None):
+        raise RuntimeError('training failed')
+
+    healthcare_ai = app.HealthcareAI
+    monkeypatch.setattr(app, 'HealthcareAI', fail)
+    assert reloader.check() is False
+    assert app.ai_system is current
+    monkeypatch.setattr(app, 'HealthcareAI', healthcare_ai)
+    assert reloader.check() is True
+    assert len(app.ai_system.dataset) == len(current.dataset) - 20
+    assert reloader.check() is False
@@ -0,0 +1,99 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+import benchmark
+
+
+@pytest.fixture
+def dataset(artifact_dir, tmp_path, monkeypatch):
+    path = tmp_path / 'heart.csv'
+    shutil.copy(app.DATASET_PATH, path)
+    monkeypatch.setattr(app, 'DATASET_PATH', str(path))
+    monkeypatch.setattr(app, 'INCREMENTAL_TRAINING', True)
+    return path
+
+
+def append_rows(path, rows, seed=7):
+    extra = benchmark.synthetic_dataset(app.DATASET_PATH, rows, seed)
+    with open(path, 'a', newline='') as f:
+        f.write(extra.to_csv(index=False, header=False))
+
+
+def test_appended_rows_update_every_model_without_a_refit(dataset):
+    base = app.HealthcareAI()
+    append_rows(dataset, 40)
+    ai = app.HealthcareAI(previous=base)
+    incremental = ai.training_report['incremental']
+    assert incremental['base_version'] == base.model_version and incremental['rows_added'] == 40
+    assert incremental['updates'] == {'Logistic Regression': 'newton', 'Random Forest': 'added_trees',
+                                      'XGBoost': 'added_rounds'}
+    # Only the appended rows were encoded
+    assert ai.X_train_scaled is None and len(ai.X_added_scaled) == incremental['train_rows_added']
+    np.testing.assert_array_equal(ai.train_index[:len(base.train_index)], base.train_index)
+    assert len(ai.models['Random Forest'].estimators_) > len(base.models['Random Forest'].estimators_)
+
+
+def test_newton_update_stays_close_to_a_full_refit(dataset):
+    base = app.HealthcareAI()
+    append_rows(dataset, 60)
+    ai = app.HealthcareAI(previous=base)
+    model = ai.models['Logistic Regression']
+    refit = app.lazy_import('sklearn.base').clone(model).fit(ai.ensure_training_matrix(), ai.y_train)
+    difference = model.predict_proba(ai.X_test_scaled)[:, 1] - refit.predict_proba(ai.X_test_scaled)[:, 1]
+    assert np.max(np.abs(difference)) < 0.02
+
+
+def test_rebased_splits_keep_every_value_on_its_side():
+    rng = np.random.default_rng(3)
+    old, new = app.Preprocessor(), app.Preprocessor()
+    old.set_statistics(10, np.array([1.0]), np.array([1.7]))
+    new.set_statistics(20, np.array([1.3]), np.array([0.7]))
+    values = [np.unique(np.round(rng.normal(1.0, 1.5, 200), 1))]
+    before = ((values[0] - old.mean) / old.std).astype(np.float32).astype(np.float64)
+    after = ((values[0] - new.mean) / new.std).astype(np.float32).astype(np.float64)
+    # Splits on a value, as sklearn and XGBoost both produce, and between neighbours
+    thresholds = np.concatenate([before, (before[1:] + before[:-1]) / 2])
+    features = np.zeros(len(thresholds), dtype=np.intp)
+    for inclusive, dtype in ((True, np.float64), (False, np.float32)):
+        moved = app.rebase_thresholds(thresholds.astype(dtype).astype(np.float64), features, old, new, values,
+                                      inclusive, dtype)
+        side = np.less_equal if inclusive else np.less
+        for threshold, rebased in zip(thresholds.astype(dtype), moved):
+            np.testing.assert_array_equal(side(before, threshold), side(after, rebased))
+
+
+def test_edited_rows_force_a_full_retrain(dataset):
+    base = app.HealthcareAI()
+    frame = pd.read_csv(dataset)
+    frame.loc[0, 'Chol'] += 1
+    frame.to_csv(dataset, index=False)
+    append_rows(dataset, 20)
+    ai = app.HealthcareAI(previous=base)
+    assert 'incremental' not in ai.training_report and ai.lineage is None
+
+
+def test_only_a_worker_continuing_the_same_base_reuses_an_update(dataset):
+    base = app.HealthcareAI()
+    append_rows(dataset, 30)
+    updated = app.HealthcareAI(previous=base)
+    assert updated.lineage == {'base': base.model_version, 'incremental': True}
+    cold = app.HealthcareAI()
+    assert cold.model_version != updated.model_version and 'incremental' not in cold.training_report
+    shutil.rmtree(app.os.path.join(app.ARTIFACT_DIR, cold.model_version))
+    other = app.HealthcareAI(previous=base)
+    assert other.model_version == updated.model_version
+    assert isinstance(other.models, app.ArtifactModels) and other.lineage == updated.lineage
+
+
+def test_append_detection(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_bytes(b'a,b\n1,2\n')
+    size, digest, _ = app.hash_dataset(path)
+    path.write_bytes(b'a,b\n1,2\n3,4\n')
+    assert app.hash_dataset(path, (size, digest))[2]
+    path.write_bytes(b'a,b\n1,5\n3,4\n')
+    assert not app.hash_dataset(path, (size, digest))[2]
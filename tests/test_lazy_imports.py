@@ -0,0 +1,26 @@
+import json
+import os
+import subprocess
+import sys
+
+import conftest
+
+PROBE = """
+import json, sys
+import app
+before = sorted(name for name in ('matplotlib', 'sklearn', 'xgboost') if name in sys.modules)
+app.ai_system.models['Random Forest']
+print(json.dumps({'before': before, 'version': app.ai_system.model_version, 'report': list(app.import_report()['modules'])}))
+"""
+
+
+def test_serving_a_stored_native_model_imports_no_training_library():
+    # A fresh interpreter on the session's artifact store, serving the NumPy export without retraining
+    env = dict(os.environ, HEALTHCARE_AI_ARTIFACT_DIR=conftest.ARTIFACT_DIR, HEALTHCARE_AI_SERVE_ONLY='1',
+               HEALTHCARE_AI_NATIVE_INFERENCE='1')
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=conftest.ROOT, env=env, capture_output=True,
+                            text=True, check=True)
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    assert probe['version'] is not None
+    assert probe['before'] == []
+    assert 'sklearn (unpickling Random Forest)' in probe['report']
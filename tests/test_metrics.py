@@ -0,0 +1,34 @@
+import re
+
+import app
+
+
+def sample(text, line):
+    match = re.search('^' + re.escape(line) + r' (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_requests_are_counted_and_timed(client, patient):
+    requests = 'healthcare_ai_requests_total{route="predict_api",method="POST",status="200"}'
+    latency = 'healthcare_ai_request_duration_seconds_count{route="predict_api",method="POST"}'
+    stage = 'healthcare_ai_stage_duration_seconds_count{stage="predict"}'
+    before = client.get('/metrics').get_data(as_text=True)
+    client.post('/api/predict', json=patient)
+    after = client.get('/metrics').get_data(as_text=True)
+    assert sample(after, requests) == sample(before, requests) + 1
+    assert sample(after, latency) == sample(before, latency) + 1
+    assert sample(after, stage) == sample(before, stage) + 1
+    assert f'best_model="{app.ai_system.best_model_name}"' in after
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = app.Histogram('test_seconds', 'Test.', ('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(('a',), value)
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{stage="a",le="0.1"} 1',
+        'test_seconds_bucket{stage="a",le="1.0"} 2',
+        'test_seconds_bucket{stage="a",le="+Inf"} 3',
+        'test_seconds_sum{stage="a"} 5.55',
+        'test_seconds_count{stage="a"} 3'
+    ]
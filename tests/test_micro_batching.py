@@ -0,0 +1,26 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+import app
+
+
+def test_concurrent_rows_are_scored_together():
+    ai = app.ai_system
+    model = ai.models[ai.best_model_name]
+    rows = [ai.X_test_scaled[i:i + 1] for i in range(16)]
+    batcher = app.MicroBatcher(max_wait_ms=50, max_rows=8)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(lambda row: batcher.predict_proba(model, row), rows))
+    np.testing.assert_allclose(np.vstack(results), model.predict_proba(np.vstack(rows)))
+    stats = batcher.stats()
+    assert stats['rows'] == 16 and stats['batches'] < 16 and stats['max_batch_size'] <= 8
+
+
+def test_a_batch_spanning_a_model_swap_scores_each_row_with_its_own_model():
+    ai = app.ai_system
+    batch = [(ai.models[name], ai.X_test_scaled[i:i + 1], Future())
+             for i, name in enumerate(['Logistic Regression', 'Random Forest', 'Logistic Regression'])]
+    app.MicroBatcher().score(batch)
+    for model, row, future in batch:
+        np.testing.assert_allclose(future.result(), model.predict_proba(row)[0])
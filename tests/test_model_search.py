@@ -0,0 +1,52 @@
+import app
+import model_search
+
+ESTIMATORS = {'Logistic Regression': app.MODEL_CLASSES['Logistic Regression'],
+              'Random Forest': app.MODEL_CLASSES['Random Forest']}
+SPACE = {'Logistic Regression': {'C': [0.01, 0.1, 1.0, 10.0]}, 'Random Forest': {'n_estimators': [5, 10, 20]}}
+
+
+def run_search(cache_dir, workers=1, **kwargs):
+    ai = app.ai_system
+    return model_search.search(ai.X_train_scaled, ai.y_train, ESTIMATORS, app.MODEL_PARAMS, SPACE, workers=workers,
+                               cache_dir=str(cache_dir), **kwargs)
+
+
+def test_halving_schedule():
+    assert model_search.halving_schedule(5, 3) == [1, 2, 5]
+    assert model_search.halving_schedule(1, 3) == [1]
+
+
+def test_interrupted_search_resumes_from_cached_folds(tmp_path):
+    first = run_search(tmp_path)
+    assert first['tasks_run'] > 0 and first['tasks_cached'] == 0
+    for name, grid in SPACE.items():
+        assert first['models'][name]['configurations'] == len(next(iter(grid.values())))
+        assert first['models'][name]['folds'] == 5
+    resumed = run_search(tmp_path)
+    assert resumed['tasks_run'] == 0 and resumed['tasks_cached'] == first['tasks_run']
+    assert resumed['models'] == first['models']
+
+
+def test_budget_stops_after_the_first_rung(tmp_path):
+    result = run_search(tmp_path, budget_seconds=1e-9)
+    assert result['budget_exhausted']
+    assert all(model['folds'] == 1 for model in result['models'].values())
+
+
+def test_training_uses_the_tuned_parameters(artifact_dir, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'MODEL_SEARCH', True)
+    monkeypatch.setattr(app, 'SEARCH_SPACE', SPACE)
+    monkeypatch.setattr(app, 'SEARCH_WORKERS', 1)
+    monkeypatch.setattr(app, 'SEARCH_DIR', str(tmp_path / 'search'))
+    ai = app.HealthcareAI()
+    search = ai.training_report['search']
+    for name in SPACE:
+        params = ai.models[name].get_params()
+        assert all(params[key] == value for key, value in search['models'][name]['params'].items())
+
+
+def test_spawned_workers_match_the_in_process_search(tmp_path):
+    pooled = run_search(tmp_path / 'pooled', workers=2)
+    assert pooled['workers'] == 2
+    assert pooled['models'] == run_search(tmp_path / 'serial')['models']
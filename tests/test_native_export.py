@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('name', ['Logistic Regression', 'Random Forest', 'XGBoost'])
+def test_export_agrees_with_the_estimator(name, tmp_path):
+    ai = app.ai_system
+    model = ai.models[name]
+    native = app.NativeModel.export(model, ai.preprocessor.mean, ai.preprocessor.std)
+    native.save(tmp_path / 'native.npz')
+    native = app.NativeModel.load(tmp_path / 'native.npz')
+    expected = model.predict_proba(ai.X_test_scaled)[:, 1]
+    assert np.max(np.abs(native.predict_proba(ai.X_test_scaled)[:, 1] - expected)) <= app.NATIVE_TOLERANCE
+    X_raw = ai.preprocessor.encode(ai.features.iloc[ai.features.index.get_indexer(ai.test_index)])
+    assert np.max(np.abs(native.score_raw(X_raw) - expected)) <= app.NATIVE_TOLERANCE
+
+
+@pytest.mark.parametrize('name', ['Random Forest', 'XGBoost'])
+def test_large_tree_blocks_are_scored_by_the_estimator(name):
+    ai = app.ai_system
+    model = ai.models[name]
+    native = app.NativeModel.export(model, ai.preprocessor.mean, ai.preprocessor.std)
+    X = np.tile(ai.X_test_scaled, (3, 1))
+    assert len(X) > app.NATIVE_BATCH_MAX_ROWS
+    walked = native.positive_proba(X)
+    native.batch_estimator = lambda: model
+    np.testing.assert_allclose(native.positive_proba(X), walked, rtol=0, atol=app.NATIVE_TOLERANCE)
+
+
+def test_native_serving_matches_the_estimator(artifact_dir, monkeypatch, patient_data):
+    monkeypatch.setattr(app, 'NATIVE_INFERENCE', True)
+    ai = app.HealthcareAI()
+    assert isinstance(ai.best_model, app.NativeModel) and ai.native_error <= app.NATIVE_TOLERANCE
+    assert abs(ai.predict(patient_data)['probability'] - app.ai_system.predict(patient_data)['probability']) \
+        <= app.NATIVE_TOLERANCE
+
+
+def test_export_is_skipped_without_native_inference_or_explanations(artifact_dir, monkeypatch, patient_data):
+    monkeypatch.setattr(app, 'EXPLANATIONS', False)
+    ai = app.HealthcareAI()
+    assert ai.best_model is not None and ai.native_model is None
+    assert not (artifact_dir / ai.model_version / 'native.npz').exists()
+    assert 'explanation' not in ai.predict(patient_data, explain=True)
+
+
+def test_export_is_verified_on_a_bounded_sample(artifact_dir, monkeypatch):
+    monkeypatch.setattr(app, 'NATIVE_VERIFY_ROWS', 50)
+    ai = app.HealthcareAI()
+    verified = []
+    monkeypatch.setattr(ai, 'verified_export', lambda name, model, X_raw, X_scaled: verified.append(len(X_raw))
+                        or (None, None))
+    ai.export_native()
+    assert verified == [50]
@@ -0,0 +1,23 @@
+import app
+
+
+def test_page_shell_is_built_once_per_title(client):
+    first = client.get('/dataset')
+    assert first.status_code == 200
+    shell = app.PAGE_SHELLS['Loaded Dataset']
+    client.get('/dataset?offset=100')
+    assert app.PAGE_SHELLS['Loaded Dataset'] is shell
+    assert '<title>' in first.get_data(as_text=True) and 'Loaded Dataset' in first.get_data(as_text=True)
+
+
+def test_unchanged_pages_revalidate(client):
+    first = client.get('/dataset')
+    assert first.headers['Cache-Control'] == 'no-cache' and first.headers.get('ETag')
+    again = client.get('/dataset', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_flashed_pages_are_not_cached(client):
+    response = client.get('/dataset?filter=Age~3')
+    assert 'no-store' in response.headers['Cache-Control']
+    assert 'Invalid filter' in response.get_data(as_text=True)
@@ -0,0 +1,16 @@
+import app
+
+
+def test_worker_count_does_not_change_the_models(artifact_dir, monkeypatch):
+    monkeypatch.setattr(app, 'TRAINING_WORKERS', 1)
+    serial = app.HealthcareAI()
+    report = serial.training_report
+    assert report['workers'] == 1
+    assert report['threads_per_model'] == report['cores']
+    assert set(report['fit_times']) == set(app.MODEL_PARAMS)
+    assert serial.model_accuracies == app.ai_system.model_accuracies
+
+
+def test_serving_keeps_the_configured_threading():
+    for name in app.MULTITHREADED_MODELS:
+        assert app.ai_system.models[name].get_params()['n_jobs'] == app.MODEL_PARAMS[name].get('n_jobs')
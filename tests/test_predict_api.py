@@ -0,0 +1,34 @@
+import app
+
+
+def test_json_prediction(client, patient, patient_data):
+    body = client.post('/api/predict', json=patient).get_json()
+    expected = app.ai_system.predict(patient_data)
+    assert body['errors'] == []
+    assert body['probability'] == expected['probability']
+    assert body['prediction'] == expected['prediction']
+    assert body['label'] == ('Disease Detected' if expected['prediction'] == 1 else 'No Disease Detected')
+    assert body['model_version'] == app.ai_system.model_version
+
+
+def test_form_fields_and_threshold(client, patient):
+    body = client.post('/api/predict?threshold=1.01', data=patient).get_json()
+    assert body['prediction'] == 0 and body['threshold'] == 1.01
+
+
+def test_invalid_requests_return_errors(client, patient):
+    missing = dict(patient)
+    del missing['Thal']
+    response = client.post('/api/predict', json=missing)
+    assert response.status_code == 400 and 'Thal' in response.get_json()['errors'][0]
+    assert client.post('/api/predict', json=dict(patient, CP='9')).status_code == 400
+    assert client.post('/api/predict', json=dict(patient, Age='old')).status_code == 400
+    assert client.post('/api/predict', json=[patient]).status_code == 400
+    assert client.post('/api/predict?threshold=x', json=patient).status_code == 400
+
+
+def test_non_finite_values_name_the_field(client, patient):
+    for value in ('nan', 'inf', '-Infinity'):
+        response = client.post('/api/predict', json=dict(patient, Oldpeak=value))
+        assert response.status_code == 400
+        assert 'Oldpeak' in response.get_json()['errors'][0]
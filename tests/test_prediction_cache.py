@@ -0,0 +1,43 @@
+import time
+
+import app
+
+
+def test_lru_eviction_and_stats():
+    cache = app.PredictionCache(max_size=2, ttl=60)
+    model = object()
+    assert cache.get(model, 'a') is None
+    cache.put(model, 'a', 1)
+    cache.put(model, 'b', 2)
+    assert cache.get(model, 'a') == 1
+    cache.put(model, 'c', 3)
+    assert cache.get(model, 'b') is None and cache.get(model, 'c') == 3
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses'], stats['evictions']) == (2, 2, 2, 1)
+
+
+def test_entries_expire():
+    cache = app.PredictionCache(max_size=4, ttl=0.01)
+    model = object()
+    cache.get(model, 'a')
+    cache.put(model, 'a', 1)
+    time.sleep(0.02)
+    assert cache.get(model, 'a') is None and cache.stats()['expirations'] == 1
+
+
+def test_a_new_model_invalidates_the_cache():
+    cache = app.PredictionCache(max_size=4, ttl=60)
+    old, new = object(), object()
+    cache.get(old, 'a')
+    cache.put(old, 'a', 1)
+    assert cache.get(new, 'a') is None
+    cache.put(old, 'a', 1)
+    assert cache.get(new, 'a') is None and cache.stats()['size'] == 0
+
+
+def test_repeat_predictions_are_served_from_the_cache(patient_data):
+    ai = app.ai_system
+    first = ai.predict(dict(patient_data, Age=41.0))
+    hits = ai.prediction_cache.stats()['hits']
+    assert ai.predict(dict(patient_data, Age=41)) == first
+    assert ai.prediction_cache.stats()['hits'] == hits + 1
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+import app
+
+
+def test_scaling_matches_standard_scaler():
+    ai = app.ai_system
+    X_train = ai.preprocessor.encode(ai.features.iloc[ai.features.index.get_indexer(ai.train_index)])
+    scaler = StandardScaler().fit(X_train)
+    np.testing.assert_array_equal(ai.preprocessor.mean, scaler.mean_)
+    np.testing.assert_array_equal(ai.preprocessor.std, scaler.scale_)
+    np.testing.assert_array_equal(ai.preprocessor.scale(X_train.copy()), scaler.transform(X_train))
+
+
+def test_state_round_trip():
+    preprocessor = app.ai_system.preprocessor
+    restored = app.Preprocessor(preprocessor.state())
+    frame = app.ai_system.features.iloc[:20]
+    assert restored.encoded_columns == preprocessor.encoded_columns
+    np.testing.assert_array_equal(restored.transform(frame), preprocessor.transform(frame))
+
+
+def test_running_statistics_match_a_full_fit():
+    matrix = np.random.default_rng(0).normal(5.0, 2.0, size=(500, 3))
+    running = app.Preprocessor()
+    running.fit_scaling(matrix[:300])
+    running.update_scaling(matrix[300:450]).update_scaling(matrix[450:])
+    full = app.Preprocessor().fit_scaling(matrix)
+    np.testing.assert_allclose(running.mean, full.mean, rtol=1e-12)
+    np.testing.assert_allclose(running.var, full.var, rtol=1e-12)
+    assert running.n_samples == 500
+
+
+def test_encoding_fills_gaps_and_one_hot_encodes_text_columns():
+    frame = pd.DataFrame({'Age': [50.0, np.nan, 70.0], 'CP': [0.0, 9.0, 2.0], 'Colour': ['red', 'blue', None]})
+    preprocessor = app.Preprocessor().fit_encoding(frame)
+    assert preprocessor.encoded_columns == ['Age', 'CP', 'Colour_blue', 'Colour_red']
+    encoded = preprocessor.encode(frame)
+    np.testing.assert_array_equal(encoded, [[50.0, 0.0, 0.0, 1.0], [60.0, 0.0, 1.0, 0.0], [70.0, 2.0, 1.0, 0.0]])
+    np.testing.assert_array_equal(preprocessor.sources.sum(axis=0), [1, 1, 2])
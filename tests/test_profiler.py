@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(app, 'PROFILE_HEADER', True)
+    monkeypatch.setattr(app, 'PROFILE_INTERVAL_MS', 0.5)
+    return tmp_path
+
+
+def test_requested_profiles_are_written(client, profile_dir):
+    response = client.get('/dataset?sort=Chol', headers={'X-Profile': '1'})
+    profile_id = response.headers['X-Profile-Id']
+    path = profile_dir / (profile_id + '.folded')
+    assert path.is_file()
+    for line in path.read_text().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert stack and int(count) > 0
+
+
+def test_unrequested_and_metrics_requests_are_not_profiled(client, profile_dir):
+    assert 'X-Profile-Id' not in client.get('/dataset').headers
+    assert 'X-Profile-Id' not in client.get('/metrics', headers={'X-Profile': '1'}).headers
+    assert os.listdir(profile_dir) == []
+
+
+def test_old_profiles_are_evicted(profile_dir, monkeypatch):
+    monkeypatch.setattr(app, 'PROFILE_MAX_FILES', 2)
+    for name in ('a', 'b', 'c'):
+        (profile_dir / f'{name}.folded').write_text('main (app.py:1) 1\n')
+    app.evict_profiles()
+    assert sorted(os.listdir(profile_dir)) == ['b.folded', 'c.folded']
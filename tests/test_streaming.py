@@ -0,0 +1,47 @@
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+import app
+import score_csv
+
+
+def patient_csv(patient, rows=25):
+    frame = pd.DataFrame([patient] * rows)
+    frame['Age'] = [str(40 + i) for i in range(rows)]
+    frame.loc[3, 'Chol'] = 'n/a'
+    return frame.to_csv(index=False)
+
+
+def test_chunked_scoring_matches_a_single_batch(patient):
+    text = patient_csv(patient)
+    whole = pd.read_csv(io.StringIO(''.join(app.ai_system.iter_scored_csv(io.StringIO(text), chunk_size=1000))))
+    chunked = pd.read_csv(io.StringIO(''.join(app.ai_system.iter_scored_csv(io.StringIO(text), chunk_size=4))))
+    pd.testing.assert_frame_equal(whole, chunked)
+    assert whole['row'].tolist() == list(range(25))
+    assert np.isnan(whole.loc[3, 'probability']) and 'Chol' in whole.loc[3, 'error']
+
+
+def test_stream_endpoint_matches_the_batch_endpoint(client, patient):
+    text = patient_csv(patient)
+    streamed = pd.read_csv(io.BytesIO(client.post('/api/predict/stream?chunk_size=7', data=text,
+                                                  content_type='text/csv').data))
+    batch = client.post('/api/predict/batch', data=text, content_type='text/csv').get_json()
+    scored = streamed.dropna(subset=['probability'])
+    assert scored['row'].tolist() == [result['row'] for result in batch['results']]
+    np.testing.assert_allclose(scored['probability'], [result['probability'] for result in batch['results']])
+
+
+def test_stream_rejects_a_bad_chunk_size(client):
+    assert client.post('/api/predict/stream?chunk_size=0', data='', content_type='text/csv').status_code == 400
+
+
+def test_score_csv_writes_the_scored_file(patient, tmp_path, monkeypatch):
+    source, target = tmp_path / 'patients.csv', tmp_path / 'scored.csv'
+    source.write_text(patient_csv(patient))
+    monkeypatch.setattr(sys, 'argv', ['score_csv.py', str(source), str(target), '--chunk-size', '10'])
+    score_csv.main()
+    scored = pd.read_csv(target)
+    assert len(scored) == 25 and scored['probability'].notna().sum() == 24
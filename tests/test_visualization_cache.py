@@ -0,0 +1,27 @@
+import os
+import time
+
+import app
+
+
+def test_plots_are_rendered_once_per_model_version(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'VIZ_CACHE_DIR', str(tmp_path))
+    assert client.get('/model_visualisations').status_code == 200
+    version_dir = tmp_path / app.ai_system.model_version
+    images = sorted(os.listdir(version_dir))
+    assert images == ['confusion_matrix.png', 'model_metrics.png', 'precision_recall_curve.png', 'roc_curve.png']
+    rendered = {name: os.stat(version_dir / name).st_mtime_ns for name in images}
+    client.get('/model_visualisations')
+    assert {name: os.stat(version_dir / name).st_mtime_ns for name in images} == rendered
+
+
+def test_eviction_keeps_recent_versions_until_they_age_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'VIZ_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(app, 'VIZ_CACHE_VERSIONS', 2)
+    monkeypatch.setattr(app, 'VIZ_CACHE_MIN_AGE', 600)
+    now = time.time()
+    for name, age in [('current', 0), ('previous', 10), ('recent', 20), ('old', 3600), ('older', 7200)]:
+        (tmp_path / name).mkdir()
+        os.utime(tmp_path / name, (now - age, now - age))
+    app.evict_visualization_cache(keep='current')
+    assert sorted(os.listdir(tmp_path)) == ['current', 'previous', 'recent']